@@ -0,0 +1,70 @@
+import json
+import os
+import random
+from typing import List
+
+VERBS = ["get", "list", "create", "update", "delete", "search", "summarize", "prioritize", "assign", "close"]
+NOUNS = ["ticket", "issue", "sprint", "user", "part", "comment", "task", "customer", "release", "tag"]
+
+
+def _api_name(index: int, rng: random.Random) -> str:
+    return f"{rng.choice(VERBS)}_{rng.choice(NOUNS)}_{index}"
+
+
+def generate_catalog(directory: str, size: int, seed: int = 0) -> List[str]:
+    """
+    Writes `size` synthetic API documentation files into `directory`, in the
+    same layout as data/api_documentation, and returns the example queries.
+    Arguments of later APIs reuse outputs of earlier ones so the catalog has
+    output -> input links like the real one.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    outputs: List[str] = []
+    queries: List[str] = []
+
+    for index in range(size):
+        api_name = _api_name(index, rng)
+        verb, noun = api_name.split("_")[:2]
+
+        arguments = []
+        for position in range(rng.randint(0, 3)):
+            if outputs and rng.random() < 0.5:
+                argument_name = rng.choice(outputs)
+            else:
+                argument_name = f"{noun}_filter_{position}"
+            arguments.append(
+                {
+                    "argument_name": argument_name,
+                    "description": f"The {argument_name.replace('_', ' ')} to {verb} {noun}s by",
+                    "ArgumentType": rng.choice(["string", "array of strings", "boolean"]),
+                    "required": rng.random() < 0.3,
+                }
+            )
+
+        output_name = f"{noun}_ids_{index}"
+        outputs.append(output_name)
+        example_queries = [
+            f"{verb} the {noun}s of {rng.choice(NOUNS)} {index}",
+            f"please {verb} my {noun} {index}",
+            f"{verb} all {noun}s",
+        ]
+        queries.extend(example_queries)
+
+        documentation = {
+            "api_name": api_name,
+            "api_description": f"{verb.capitalize()}s {noun}s matching the request",
+            "arguments": arguments,
+            "output": [
+                {
+                    "output_name": output_name,
+                    "description": f"a list of {noun} ids",
+                    "output_type": "list",
+                }
+            ],
+            "example_queries": example_queries,
+        }
+        with open(os.path.join(directory, f"{api_name}.txt"), "w") as f:
+            f.write(json.dumps(documentation, indent=4))
+
+    return queries
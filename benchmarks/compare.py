@@ -0,0 +1,40 @@
+import argparse
+import json
+from typing import Any, Dict
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> None:
+    old = flatten(baseline)
+    new = flatten(candidate)
+    for name in sorted(old.keys() & new.keys()):
+        if name.startswith("settings."):
+            continue
+        before, after = old[name], new[name]
+        change = (after - before) / before * 100 if before else 0.0
+        marker = " <--" if abs(change) >= threshold else ""
+        print(f"{name:80s} {before:12.3f} {after:12.3f} {change:+8.1f}%{marker}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="mark changes above this percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    compare(baseline, candidate, args.threshold)
@@ -0,0 +1,165 @@
+import json
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from doc_store import parse_api_documentation
+
+_FILLER = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod"
+
+
+class FakeLLMError(RuntimeError):
+    pass
+
+
+class FakeLLMStats:
+    """Call counts and time spent inside the fake LLM, shared by all components."""
+
+    def __init__(self) -> None:
+        self.calls: Dict[str, int] = {}
+        self.requests = 0
+        self.failures = 0
+        self.llm_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, component: str, elapsed: float, failed: bool, prompts: int = 1) -> None:
+        """Records one request answering the given number of prompts."""
+        with self._lock:
+            self.calls[component] = self.calls.get(component, 0) + prompts
+            self.requests += 1
+            # every prompt in a batch waited for the whole request
+            self.llm_time += elapsed * prompts
+            if failed:
+                self.failures += prompts
+
+
+class FakeLLM:
+    """
+    Scripted stand-in for the OpenAI LLM. It answers each component's prompt
+    with a response in the shape main.py expects, after sleeping for the
+    configured latency, so the rest of the pipeline runs unchanged. Batches
+    from generate_batch are answered after a single latency, like a
+    provider's multi-prompt request.
+
+    :param latency: mean seconds per call.
+    :param jitter: fraction of the latency added or removed at random.
+    :param failure_rate: probability that a call raises FakeLLMError.
+    :param response_words: filler words appended to every response.
+    :param plan_steps: plan steps emitted before the planner gives a final answer.
+    :param unresolved_rate: probability that the argument extractor returns
+        null for a required argument missing from the variable table, which
+        sends main.py to the sub API selector.
+    """
+
+    def __init__(
+        self,
+        component: str,
+        stats: FakeLLMStats,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        response_words: int = 0,
+        plan_steps: int = 2,
+        unresolved_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.component = component
+        self.stats = stats
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.response_words = response_words
+        self.plan_steps = plan_steps
+        self.unresolved_rate = unresolved_rate
+        self.random = random.Random(f"{seed}:{component}")
+
+    def __call__(self, prompt: str, stop: Optional[List[str]] = None) -> str:
+        return self.generate_batch([prompt], stop)[0]
+
+    def generate_batch(self, prompts: List[str], stop: Optional[List[str]] = None) -> List[str]:
+        start = time.perf_counter()
+        failed = self.random.random() < self.failure_rate
+        try:
+            delay = self.latency * (1 + self.jitter * (2 * self.random.random() - 1))
+            if delay > 0:
+                time.sleep(delay)
+            if failed:
+                raise FakeLLMError(f"Injected failure in {self.component}")
+            return [self._respond(prompt) for prompt in prompts]
+        finally:
+            self.stats.record(
+                self.component, time.perf_counter() - start, failed, len(prompts)
+            )
+
+    def _filler(self) -> str:
+        words = _FILLER.split()
+        return " ".join(words[i % len(words)] for i in range(self.response_words))
+
+    def _respond(self, prompt: str) -> str:
+        if self.component == "Planner":
+            return self._plan(prompt)
+        if self.component == "FinalAPISelector":
+            return self._select_final_api(prompt)
+        if self.component == "SubAPISelector":
+            return self._select_sub_api(prompt)
+        if self.component == "ArgumentExtractor":
+            return self._extract_arguments(prompt)
+        return self._filler()
+
+    def _plan(self, prompt: str) -> str:
+        scratchpad = prompt[prompt.rfind("Begin!") :]
+        steps_done = scratchpad.count("API response:")
+        if steps_done >= self.plan_steps:
+            return "Thought: I am finished executing a plan.\nFinal Answer: Done."
+        query = re.search(r"User query: (.*)", scratchpad).group(1)
+        step = f"Step {steps_done + 1} of {query}"
+        if self.response_words:
+            step += " " + self._filler()
+        return step
+
+    def _select(self, api_name: str, source: str) -> str:
+        answer = {"api_name": api_name, "data_source": source}
+        if self.response_words:
+            answer["reason"] = self._filler()
+        return json.dumps(answer)
+
+    def _select_final_api(self, prompt: str) -> str:
+        # later chunks of a split doc carry no api_name, so skip to the first that does
+        for block in re.finditer(r"Next API:\n(.*?)\nSource: (.*?)\n", prompt, re.DOTALL):
+            api_name = parse_api_documentation(block.group(1))["api_name"]
+            if api_name:
+                return self._select(api_name, block.group(2).strip())
+        return json.dumps("None")
+
+    def _select_sub_api(self, prompt: str) -> str:
+        api_name = re.search(r'\\?"api_name\\?"\s*:\s*\\?"(\w+)', prompt)
+        source = re.search(r"'source': '([^']+)'", prompt)
+        if api_name is None or source is None:
+            return json.dumps("None")
+        return self._select(api_name.group(1), source.group(1))
+
+    def _extract_arguments(self, prompt: str) -> str:
+        available = {}
+        block = prompt.split("Available Arguments:", 1)[1].split("You are an", 1)[0]
+        handles = re.findall(r"^\s*([\w.]+): .*?(\$\$PREV\[\d+\](?:\.[\w.]+)?)\)\s*$", block, re.M)
+        for name, handle in handles:
+            available[name] = handle
+
+        documentation = prompt.split("API Documentation:", 1)[1]
+        arguments = {}
+        for argument in parse_api_documentation(documentation)["arguments"]:
+            name = argument["argument_name"]
+            if name in available:
+                arguments[name] = available[name]
+            elif argument["required"]:
+                if self.random.random() < self.unresolved_rate:
+                    arguments[name] = None
+                else:
+                    arguments[name] = f"value_for_{name}"
+            else:
+                arguments[name] = "RequiredFalse"
+        for i in range(self.response_words // 8):
+            arguments[f"padding_{i}"] = "RequiredFalse"
+        return json.dumps(arguments)
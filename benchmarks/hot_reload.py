@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+from benchmarks.catalog import generate_catalog
+from config import get_config
+from vector_index import INDEX_TYPES
+
+
+def misplaced_positions(store, top_k: int = 5) -> int:
+    """
+    Positions whose own chunk, embedded again, doesn't find itself (or an
+    identical text) among its top_k neighbours, i.e. where
+    index_to_docstore_id points at the wrong chunk.
+    """
+
+    def text(position: int) -> str:
+        return store.docstore.search(store.index_to_docstore_id[position]).page_content
+
+    positions = sorted(store.index_to_docstore_id)
+    texts = [text(position) for position in positions]
+    vectors = np.array(store.embedding_function.embed_documents(texts), dtype=np.float32)
+    _, found = store.index.search(vectors, top_k)
+    misplaced = 0
+    for own_text, row in zip(texts, found):
+        neighbours = [text(int(position)) for position in row if position in store.index_to_docstore_id]
+        if own_text not in neighbours:
+            misplaced += 1
+    return misplaced
+
+
+def check_stores(vector_db, top_k: int) -> Dict[str, int]:
+    result = {"chunks": misplaced_positions(vector_db.db, top_k)}
+    if vector_db.query_db is not None:
+        result["example_queries"] = misplaced_positions(vector_db.query_db, top_k)
+    return result
+
+
+def run_index_type(work_dir: str, index_type: str, size: int, seed: int, top_k: int) -> Dict[str, Any]:
+    from retriever import VectorDataBase
+
+    data_path = os.path.join(work_dir, index_type, "data")
+    faiss_data_path = os.path.join(work_dir, index_type, "db_faiss")
+    directory = os.path.join(data_path, "api_documentation")
+    generate_catalog(directory, size, seed)
+    get_config().parser.read_dict(
+        {
+            "faiss": {"index_type": index_type, "data": data_path, "faiss_data_path": faiss_data_path},
+            "build": {"workers": "1"},
+        }
+    )
+    vector_db = VectorDataBase()
+    vector_db.create_vector_db()
+    vector_db = VectorDataBase()
+    vector_db.load_db()
+    before = check_stores(vector_db, top_k)
+
+    # edit one doc, delete another and add a new one
+    sources = vector_db.documentation_files()
+    with open(sources[0], "a") as f:
+        f.write("\n")
+    with open(sources[1], "r") as f:
+        added = os.path.join(directory, "zz_added_api.txt")
+        text = f.read()
+    os.remove(sources[1])
+    with open(added, "w") as f:
+        f.write(text)
+
+    start = time.perf_counter()
+    vector_db.reload_sources([sources[0], added], [sources[1]])
+    reload_time = time.perf_counter() - start
+    return {
+        "misplaced_before_reload": before,
+        "misplaced_after_reload": check_stores(vector_db, top_k),
+        "reload_s": reload_time,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checks that hot reloads keep every index type consistent")
+    parser.add_argument("--catalog-size", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write results as json")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="reversegpt_reload_")
+    try:
+        results = {
+            index_type: run_index_type(work_dir, index_type, args.catalog_size, args.seed, args.top_k)
+            for index_type in INDEX_TYPES
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps({"settings": vars(args), "index_types": results}, indent=4)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
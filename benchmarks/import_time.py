@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+MODULES = [
+    "config",
+    "executor",
+    "retriever",
+    "modules",
+    "planner",
+    "result_formatter",
+    "main",
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_TIMER = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def time_import(module: str, repeat: int = 5) -> List[float]:
+    """Imports the module in a fresh interpreter each time and returns the wall times."""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _TIMER.format(module=module)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def run(modules: List[str] = MODULES, repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for module in modules:
+        timings = time_import(module, repeat)
+        results[module] = {
+            "median_ms": statistics.median(timings) * 1000,
+            "min_ms": min(timings) * 1000,
+            "max_ms": max(timings) * 1000,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time of ReverseGPT modules")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="write results as json")
+    args = parser.parse_args()
+
+    results = run(repeat=args.repeat)
+    for module, stats in results.items():
+        print(
+            f"{module:20s} {stats['median_ms']:8.2f} ms "
+            f"(min {stats['min_ms']:.2f}, max {stats['max_ms']:.2f})"
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            f.write(json.dumps(results, indent=4))
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.catalog import generate_catalog
+from benchmarks.run import summarize
+from config import get_config
+from embeddings import create_embeddings
+from vector_index import INDEX_TYPES, build_index, index_memory_bytes, index_params
+
+
+def load_texts(directory: str) -> List[str]:
+    texts = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), "r") as f:
+            texts.append(f.read())
+    return texts
+
+
+def recall_at_k(expected: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(e) & set(f[f >= 0])) for e, f in zip(expected, found))
+    return hits / expected.size
+
+
+def evaluate(
+    vectors: np.ndarray, queries: np.ndarray, top_k: int, overrides: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Builds every index type over the same vectors and compares it against flat search."""
+    base_params = index_params(get_config())
+    if overrides:
+        base_params.update(overrides)
+
+    results: Dict[str, Any] = {}
+    expected = None
+    for index_type in INDEX_TYPES:
+        params = dict(base_params, index_type=index_type)
+        start = time.perf_counter()
+        index = build_index(vectors, params)
+        index.add(vectors)
+        build_time = time.perf_counter() - start
+
+        timings = []
+        found = []
+        for query in queries:
+            start = time.perf_counter()
+            _, ids = index.search(query.reshape(1, -1), top_k)
+            timings.append(time.perf_counter() - start)
+            found.append(ids[0])
+        found = np.array(found)
+        if index_type == "flat":
+            expected = found
+
+        results[index_type] = {
+            "build_s": build_time,
+            "memory_bytes": index_memory_bytes(index),
+            f"recall_at_{top_k}": recall_at_k(expected, found),
+            "search": summarize(timings),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall vs latency of faiss index types against flat search")
+    parser.add_argument("--catalog-size", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=None)
+    parser.add_argument("--ef-search", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write results as json")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.nprobe is not None:
+        overrides["nprobe"] = args.nprobe
+    if args.ef_search is not None:
+        overrides["ef_search"] = args.ef_search
+
+    with tempfile.TemporaryDirectory() as directory:
+        example_queries = generate_catalog(directory, args.catalog_size, args.seed)
+        texts = load_texts(directory)
+
+    embeddings = create_embeddings(get_config())
+    if hasattr(embeddings, "fit"):
+        embeddings.fit(texts)
+    vectors = np.array(embeddings.embed_documents(texts), dtype=np.float32)
+    rng = random.Random(args.seed)
+    sample = [rng.choice(example_queries) for _ in range(args.queries)]
+    queries = np.array(embeddings.embed_documents(sample), dtype=np.float32)
+
+    results = {
+        "settings": vars(args),
+        "index_types": evaluate(vectors, queries, args.top_k, overrides),
+    }
+    output = json.dumps(results, indent=4)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
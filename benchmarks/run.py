@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import llm
+from benchmarks import import_time
+from benchmarks.catalog import generate_catalog
+from benchmarks.fake_llm import FakeLLM, FakeLLMStats
+from config import get_config
+from executor import Executor
+
+REAL_QUERIES = [
+    "summarize work items similar to don:core:dvrv-us-1:devo/0:issue/1",
+    "Prioritize my P0 issues and add them to the current sprint",
+    "What is the current sprint id",
+    "Summarize high severity tickets from the customer UltimateCustomer",
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+    }
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.timings: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, stage: str, obj: Any, method: str) -> None:
+        """Replaces obj.method with a version that records its wall time under stage."""
+        original = getattr(obj, method)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+
+        setattr(obj, method, timed)
+
+    def record(self, stage: str, elapsed: float) -> None:
+        with self._lock:
+            self.timings.setdefault(stage, []).append(elapsed)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: summarize(values) for stage, values in self.timings.items()}
+
+
+def configure(data_path: str, faiss_data_path: str, embeddings_backend: Optional[str] = None) -> None:
+    overrides = {
+        "faiss": {"data": data_path, "faiss_data_path": faiss_data_path},
+        "llm": {"backend": "fake"},
+        "openai": {"request_interval": "0"},
+        "cassette": {"mode": "off"},
+    }
+    if embeddings_backend is not None:
+        overrides["embeddings"] = {"backend": embeddings_backend}
+    get_config().parser.read_dict(overrides)
+
+
+def register_fake_llm(stats: FakeLLMStats, args: argparse.Namespace) -> None:
+    def factory(model: str, temperature: float, component: str) -> FakeLLM:
+        return FakeLLM(
+            component,
+            stats,
+            latency=args.latency,
+            jitter=args.jitter,
+            failure_rate=args.failure_rate,
+            response_words=args.response_words,
+            plan_steps=args.plan_steps,
+            unresolved_rate=args.unresolved_rate,
+            seed=args.seed,
+        )
+
+    llm.register_backend("fake", factory)
+
+
+def build_index(
+    data_path: str, faiss_data_path: str, embeddings_backend: Optional[str] = None
+) -> Dict[str, Any]:
+    from retriever import VectorDataBase
+
+    configure(data_path, faiss_data_path, embeddings_backend)
+    vector_db = VectorDataBase()
+    start = time.perf_counter()
+    vector_db.create_vector_db()
+    build_time = time.perf_counter() - start
+
+    vector_db = VectorDataBase()
+    start = time.perf_counter()
+    vector_db.load_db()
+    load_time = time.perf_counter() - start
+    return {
+        "vector_db": vector_db,
+        "build_s": build_time,
+        "load_s": load_time,
+    }
+
+
+def bench_retriever(vector_db, queries: List[str], top_k: int = 10) -> Dict[str, Any]:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        vector_db.retrieve_using_similarity_search(query, top_k=top_k)
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def bench_executor(repeat: int) -> Dict[str, Any]:
+    executor = Executor()
+    calls = [
+        {"api_name": "who_am_i", "arguments": {}},
+        {"api_name": "get_sprint_id", "arguments": {}},
+        {"api_name": "work_list", "arguments": {}},
+        {"api_name": "get_similar_work_items", "arguments": {"work_id": "issue/1"}},
+        {"api_name": "summarize_objects", "arguments": {"objects": ["a", "b"]}},
+        {"api_name": "add_work_items_to_sprint", "arguments": {"work_ids": ["a"], "sprint_id": "s"}},
+    ]
+    timings = []
+    for _ in range(repeat):
+        for call in calls:
+            start = time.perf_counter()
+            executor.run(call)
+            timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def bench_end_to_end(
+    vector_db, queries: List[str], stats: FakeLLMStats, concurrency: int
+) -> Dict[str, Any]:
+    import main
+
+    timer = StageTimer()
+    speculation_stats: Dict[str, int] = {}
+    # one set of components per worker, like separate worker processes would have
+    local = threading.local()
+
+    def components() -> Dict[str, Any]:
+        if not hasattr(local, "components"):
+            local.components = main.load_components("fake", 0.0)
+            timer.wrap("planner", local.components["planner"], "run")
+            timer.wrap("final_api_selector", local.components["api_selector"], "select_api_from_query")
+            timer.wrap("sub_api_selector", local.components["sub_api_selector"], "get_api_from_argument")
+            timer.wrap("argument_extractor", local.components["argument_extractor"], "get_arguments_from_query")
+            timer.wrap("documentation", local.components["argument_extractor"], "load_documentation")
+            timer.wrap("executor", local.components["executor"], "run")
+            # only the lookups a query waits on, not the speculator's prefetches
+            timer.wrap("retrieval", local.components["api_selector"], "get_context_from_retriver")
+            timer.wrap("retrieval", local.components["sub_api_selector"], "get_context_from_retriver")
+        return local.components
+
+    query_times: List[float] = []
+    failures = 0
+    lock = threading.Lock()
+
+    def run_one(query: str) -> None:
+        nonlocal failures
+        query_speculation: Dict[str, int] = {}
+        start = time.perf_counter()
+        try:
+            main.run_query(query, vector_db, components(), speculation_stats=query_speculation)
+        except Exception:
+            with lock:
+                failures += 1
+        elapsed = time.perf_counter() - start
+        with lock:
+            query_times.append(elapsed)
+            for key, value in query_speculation.items():
+                speculation_stats[key] = speculation_stats.get(key, 0) + value
+
+    llm_time_before = stats.llm_time
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run_one, queries))
+    wall_time = time.perf_counter() - start
+    llm_time = stats.llm_time - llm_time_before
+
+    return {
+        "queries": len(queries),
+        "failed_queries": failures,
+        "wall_s": wall_time,
+        "throughput_qps": len(queries) / wall_time if wall_time > 0 else 0.0,
+        "query": summarize(query_times),
+        "stages": timer.summary(),
+        "llm_s": llm_time,
+        "framework_overhead_ms_per_query": (sum(query_times) - llm_time) / len(queries) * 1000,
+        "speculation": speculation_stats,
+    }
+
+
+def run_catalog(
+    name: str, data_path: str, queries: List[str], args: argparse.Namespace
+) -> Dict[str, Any]:
+    faiss_data_path = os.path.join(args.work_dir, name, "db_faiss")
+    index = build_index(data_path, faiss_data_path, args.embeddings)
+    stats = FakeLLMStats()
+    register_fake_llm(stats, args)
+
+    rng = random.Random(args.seed)
+    sample = [rng.choice(queries) for _ in range(args.queries)]
+    result = {
+        "index_build_s": index["build_s"],
+        "index_load_s": index["load_s"],
+        "retriever": bench_retriever(index["vector_db"], sample),
+        "end_to_end": bench_end_to_end(index["vector_db"], sample, stats, args.concurrency),
+        "llm_calls": dict(stats.calls),
+        "llm_requests": stats.requests,
+        "llm_failures": stats.failures,
+        "max_rss_mb": max_rss_mb(),
+    }
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="End-to-end ReverseGPT benchmark with a fake LLM")
+    parser.add_argument("--catalog-sizes", type=int, nargs="*", default=[], help="synthetic catalog sizes, e.g. 10 100 1000 10000")
+    parser.add_argument("--skip-real-catalog", action="store_true", help="only benchmark synthetic catalogs")
+    parser.add_argument("--queries", type=int, default=20, help="queries per catalog")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean fake LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="fraction of latency to vary by")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--response-words", type=int, default=0)
+    parser.add_argument("--plan-steps", type=int, default=2)
+    parser.add_argument("--unresolved-rate", type=float, default=0.0, help="probability that a required argument is left for the sub API selector")
+    parser.add_argument("--executor-repeat", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embeddings", default=None, help="embedding backend, defaults to the config")
+    parser.add_argument("--speculation", action="store_true", help="prefetch for the likely next APIs while the planner runs")
+    parser.add_argument("--batching", action="store_true", help="micro-batch LLM calls across concurrent queries")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=20)
+    parser.add_argument("--work-dir", default=None, help="where to write catalogs and indexes")
+    parser.add_argument("--output", default=None, help="write results as json")
+    args = parser.parse_args(argv)
+
+    if args.speculation:
+        get_config().parser.read_dict({"speculation": {"enabled": "true"}})
+    if args.batching:
+        get_config().parser.read_dict(
+            {
+                "llm": {
+                    "batching": "true",
+                    "max_batch_size": str(args.max_batch_size),
+                    "max_wait_ms": str(args.max_wait_ms),
+                }
+            }
+        )
+
+    cleanup = args.work_dir is None
+    if cleanup:
+        args.work_dir = tempfile.mkdtemp(prefix="reversegpt_bench_")
+
+    results: Dict[str, Any] = {
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "work_dir")},
+        "startup": import_time.run(["main"], repeat=3),
+        "executor": bench_executor(args.executor_repeat),
+        "catalogs": {},
+    }
+    try:
+        if not args.skip_real_catalog:
+            real_data_path = get_config().data_path
+            results["catalogs"]["real"] = run_catalog("real", real_data_path, REAL_QUERIES, args)
+        for size in args.catalog_sizes:
+            data_path = os.path.join(args.work_dir, f"synthetic_{size}")
+            queries = generate_catalog(os.path.join(data_path, "api_documentation"), size, args.seed)
+            results["catalogs"][f"synthetic_{size}"] = run_catalog(f"synthetic_{size}", data_path, queries, args)
+    finally:
+        if cleanup:
+            shutil.rmtree(args.work_dir, ignore_errors=True)
+
+    results["max_rss_mb"] = max_rss_mb()
+    output = json.dumps(results, indent=4)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict
+
+from config import get_config
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+_cassette = None
+_lock = threading.Lock()
+
+
+class CassetteMissError(KeyError):
+    pass
+
+
+class Cassette:
+    """
+    Records LLM prompts/responses and executor results to a json lines file,
+    and serves them back in replay mode so a run can be repeated offline.
+
+    Interactions are matched on their kind and request; identical requests are
+    replayed in the order they were recorded.
+    """
+
+    def __init__(self, path: str, mode: str = OFF, latency: float = 0.0) -> None:
+        if mode not in (OFF, RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._interactions: Dict[str, Deque[Any]] = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._file = None
+
+        if self.mode == REPLAY:
+            self._load()
+
+    @staticmethod
+    def _key(kind: str, request: Any) -> str:
+        payload = json.dumps(request, sort_keys=True, default=str)
+        return kind + ":" + hashlib.sha256(payload.encode()).hexdigest()
+
+    def _load(self) -> None:
+        with open(self.path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                interaction = json.loads(line)
+                key = self._key(interaction["kind"], interaction["request"])
+                self._interactions[key].append(interaction["response"])
+
+    def _record(self, kind: str, request: Any, response: Any) -> None:
+        line = json.dumps(
+            {"kind": kind, "request": request, "response": response}, default=str
+        )
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "w")
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def _replay(self, kind: str, request: Any) -> Any:
+        key = self._key(kind, request)
+        with self._lock:
+            responses = self._interactions.get(key)
+            if not responses:
+                raise CassetteMissError(
+                    f"No recorded {kind} interaction for request: {request}"
+                )
+            response = responses.popleft()
+        if kind == "llm" and self.latency > 0:
+            time.sleep(self.latency)
+        return copy.deepcopy(response)
+
+    def call(self, kind: str, request: Any, func: Callable[[], Any]) -> Any:
+        if self.mode == REPLAY:
+            return self._replay(kind, request)
+
+        response = func()
+        if self.mode == RECORD:
+            self._record(kind, request, response)
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def get_cassette() -> Cassette:
+    global _cassette
+    if _cassette is None:
+        with _lock:
+            if _cassette is None:
+                config = get_config()
+                _cassette = Cassette(
+                    path=config.get("cassette", "path", fallback="cassettes/run.jsonl"),
+                    mode=config.get("cassette", "mode", fallback=OFF),
+                    latency=config.getfloat("cassette", "latency", fallback=0.0),
+                )
+    return _cassette
@@ -0,0 +1,73 @@
+import threading
+from typing import Dict, List
+
+from config import DEFAULT_CATALOG, get_config
+from retriever import VectorDataBase
+
+
+class CatalogRegistry:
+    """
+    Loads several API catalogs side by side in one process. Catalogs whose
+    indexes were built with the same embeddings share a single loaded model
+    and query-embedding cache, so each extra catalog only costs its index.
+    With [hot_reload] enabled, every loaded catalog is watched for doc changes.
+    """
+
+    def __init__(self) -> None:
+        self.config = get_config()
+        self.default = self.config.get("catalogs", "default", fallback=DEFAULT_CATALOG)
+        self.cache_size = self.config.getint(
+            "embeddings", "query_cache_size", fallback=1024
+        )
+        self._catalogs: Dict[str, VectorDataBase] = {}
+        self._embeddings = {}
+        self._watchers = []
+        self.hot_reload = self.config.getboolean("hot_reload", "enabled", fallback=False)
+        self._lock = threading.Lock()
+
+    @property
+    def names(self) -> List[str]:
+        return [DEFAULT_CATALOG] + self.config.catalogs
+
+    def _embeddings_for(self, faiss_data_path: str):
+        from embeddings import CachedEmbeddings, embeddings_key, load_embeddings
+
+        key = embeddings_key(faiss_data_path, self.config)
+        if key not in self._embeddings:
+            self._embeddings[key] = CachedEmbeddings(
+                load_embeddings(faiss_data_path, self.config), self.cache_size
+            )
+        return self._embeddings[key]
+
+    def _watch(self, vector_db: VectorDataBase):
+        from hot_reload import DocumentationWatcher
+
+        return DocumentationWatcher(
+            vector_db,
+            interval=self.config.getfloat("hot_reload", "interval", fallback=2.0),
+            persist=self.config.getboolean("hot_reload", "persist", fallback=True),
+        ).start()
+
+    def get(self, catalog: str = None) -> VectorDataBase:
+        """Returns the loaded catalog, loading it on first use."""
+        catalog = catalog or self.default
+        with self._lock:
+            if catalog not in self._catalogs:
+                _, faiss_data_path = self.config.catalog_paths(catalog)
+                vector_db = VectorDataBase(
+                    catalog, embeddings=self._embeddings_for(faiss_data_path)
+                )
+                vector_db.load_db()
+                self._catalogs[catalog] = vector_db
+                if self.hot_reload:
+                    self._watchers.append(self._watch(vector_db))
+            return self._catalogs[catalog]
+
+    def load_all(self) -> None:
+        for catalog in self.names:
+            self.get(catalog)
+
+    def close(self) -> None:
+        for watcher in self._watchers:
+            watcher.stop()
+        self._watchers = []
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from config import get_config
+
+_store = None
+_lock = threading.Lock()
+
+
+class CheckpointStore:
+    """
+    Saves the state of an in-flight query after every completed step, one
+    compact json file per run, so a failed run can be resumed from its last
+    completed step instead of starting over.
+    """
+
+    def __init__(self, directory: str, enabled: bool = False, resume: bool = False) -> None:
+        self.directory = directory
+        self.enabled = enabled
+        self.resume = resume
+
+    @staticmethod
+    def run_id(query: str, position: Optional[int] = None) -> str:
+        """
+        :param position: index of the query in a batch, so repeated queries
+            in one batch get separate checkpoints.
+        """
+        run_id = hashlib.sha1(query.encode()).hexdigest()[:16]
+        if position is not None:
+            run_id = f"{position}-{run_id}"
+        return run_id
+
+    def path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{run_id}.json")
+
+    def save(self, run_id: str, state: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(run_id)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.directory, prefix=f"{run_id}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(json.dumps(state, separators=(",", ":"), default=str))
+            # replace is atomic, so a crash mid-write leaves the previous checkpoint intact
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        if not (self.enabled and self.resume):
+            return None
+        try:
+            with open(self.path(run_id), "r") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def delete(self, run_id: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            os.remove(self.path(run_id))
+        except FileNotFoundError:
+            pass
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                config = get_config()
+                _store = CheckpointStore(
+                    directory=config.get("checkpoint", "directory", fallback="checkpoints"),
+                    enabled=config.getboolean("checkpoint", "enabled", fallback=False),
+                    resume=config.getboolean("checkpoint", "resume", fallback=False),
+                )
+    return _store
@@ -0,0 +1,103 @@
+import os
+import threading
+from configparser import ConfigParser
+
+CONFIG_PATH = os.environ.get("REVERSE_GPT_CONFIG", "config.ini")
+DEFAULT_CATALOG = "default"
+
+_config = None
+_lock = threading.Lock()
+
+
+class Config:
+    """
+    Settings parsed from config.ini. Use get_config() instead of creating
+    this directly so the file is only read once per process.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH) -> None:
+        self.path = path
+        self.parser = ConfigParser()
+        self.parser.read(path)
+
+    def get(self, section: str, option: str, fallback=None):
+        return self.parser.get(section, option, fallback=fallback)
+
+    def getint(self, section: str, option: str, fallback=None):
+        return self.parser.getint(section, option, fallback=fallback)
+
+    def getfloat(self, section: str, option: str, fallback=None):
+        return self.parser.getfloat(section, option, fallback=fallback)
+
+    def getboolean(self, section: str, option: str, fallback=None):
+        return self.parser.getboolean(section, option, fallback=fallback)
+
+    @property
+    def openai_secret_key(self) -> str:
+        return self.parser["openai"]["secret_key"]
+
+    @property
+    def model(self) -> str:
+        return self.parser["openai"]["model"]
+
+    @property
+    def temperature(self) -> float:
+        return float(self.parser["openai"]["temperature"])
+
+    @property
+    def data_path(self) -> str:
+        return self.parser["faiss"]["data"]
+
+    @property
+    def faiss_data_path(self) -> str:
+        return self.parser["faiss"]["faiss_data_path"]
+
+    @property
+    def chunk_size(self) -> int:
+        return int(self.parser["faiss"]["chunk_size"])
+
+    @property
+    def chunk_overlap(self) -> int:
+        return int(self.parser["faiss"]["chunk_overlap"])
+
+    @property
+    def embedding_model(self) -> str:
+        return self.parser["huggingface"]["embedding_model"]
+
+    @property
+    def query(self) -> str:
+        return self.parser["query"]["query"]
+
+    @property
+    def catalogs(self):
+        """Names of the catalogs configured in [catalog:<name>] sections, besides the default one."""
+        return [
+            section.split(":", 1)[1]
+            for section in self.parser.sections()
+            if section.startswith("catalog:")
+        ]
+
+    def catalog_paths(self, catalog: str = None):
+        """
+        Returns (data, faiss_data_path) for a catalog. The default catalog
+        uses the [faiss] section, other catalogs their [catalog:<name>] section.
+        """
+        if catalog is None or catalog == DEFAULT_CATALOG:
+            return self.data_path, self.faiss_data_path
+        section = f"catalog:{catalog}"
+        if not self.parser.has_section(section):
+            raise KeyError(f"Unknown catalog: {catalog}")
+        return self.parser[section]["data"], self.parser[section]["faiss_data_path"]
+
+
+def get_config() -> Config:
+    global _config
+    if _config is None:
+        with _lock:
+            if _config is None:
+                config = Config()
+                secret_key = config.get("openai", "secret_key")
+                if secret_key is not None:
+                    os.environ["OPENAI_API_KEY"] = secret_key
+                _config = config
+    return _config
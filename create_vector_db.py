@@ -1,5 +1,12 @@
+import logging
+import sys
+
 from retriever import VectorDataBase
 
 if __name__ == "__main__":
-    vector_db = VectorDataBase()
-    vector_db.create_vector_db()
+    # progress and throughput of the build
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    # optionally pass the names of the catalogs to build, defaults to the default catalog
+    for catalog in sys.argv[1:] or [None]:
+        vector_db = VectorDataBase(catalog)
+        vector_db.create_vector_db()
@@ -0,0 +1,78 @@
+import os
+import re
+import threading
+from typing import Any, Dict, Tuple
+
+_STRING = r'"((?:[^"\\]|\\.)*)"'
+
+
+class DocumentationStore:
+    """
+    In-memory cache of API documentation files keyed by source path. Entries
+    are revalidated against the file's mtime and size on every read, so edited
+    docs are picked up without restarting.
+    """
+
+    def __init__(self) -> None:
+        self._documents: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def read(self, source: str) -> str:
+        stat = os.stat(source)
+        with self._lock:
+            cached = self._documents.get(source)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        with open(source, "r") as f:
+            text = f.read()
+        with self._lock:
+            self._documents[source] = (stat.st_mtime_ns, stat.st_size, text)
+        return text
+
+    def invalidate(self, source: str = None) -> None:
+        with self._lock:
+            if source is None:
+                self._documents.clear()
+            else:
+                self._documents.pop(source, None)
+
+
+documentation_store = DocumentationStore()
+
+
+def parse_api_documentation(text: str) -> Dict[str, Any]:
+    """
+    Extracts the structured fields from an API documentation file. The docs are
+    json-like but not strict json (trailing commas, python booleans), so the
+    fields are matched with regular expressions instead of json.loads.
+    """
+
+    def field(name: str, source: str) -> str:
+        match = re.search(rf'"{name}"\s*:\s*{_STRING}', source)
+        return match.group(1) if match is not None else ""
+
+    output_start = text.find('"output"')
+    arguments_text = text if output_start == -1 else text[:output_start]
+    arguments = []
+    for segment in re.split(r'(?="argument_name")', arguments_text)[1:]:
+        required = re.search(r'"required"\s*:\s*(true|false)', segment, re.IGNORECASE)
+        arguments.append(
+            {
+                "argument_name": field("argument_name", segment),
+                "required": required is not None and required.group(1).lower() == "true",
+            }
+        )
+
+    example_queries = []
+    examples = re.search(r'"example_queries"\s*:\s*\[(.*?)\]', text, re.DOTALL)
+    if examples is not None:
+        example_queries = re.findall(_STRING, examples.group(1))
+
+    return {
+        "api_name": field("api_name", text),
+        "api_description": field("api_description", text),
+        "arguments": arguments,
+        "outputs": re.findall(rf'"output_name"\s*:\s*{_STRING}', text),
+        "example_queries": example_queries,
+    }
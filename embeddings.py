@@ -0,0 +1,246 @@
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+METADATA_FILE = "index_meta.json"
+HASHING_IDF_FILE = "hashing_idf.npy"
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, dimensions: int) -> Tuple[int, float]:
+    hashed = zlib.crc32(feature.encode())
+    # the top bit picks the sign so colliding features tend to cancel out
+    return hashed % dimensions, 1.0 if hashed & 0x80000000 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Dependency-light TF-IDF embeddings over hashed word and character n-grams.
+    The idf weights are fitted on the indexed chunks, so the same fitted
+    instance has to be used when the index is loaded.
+    """
+
+    name = "hashing"
+    # pure python and picklable, so the index build embeds in its worker processes
+    parallel = True
+
+    def __init__(self, dimensions: int = 1024, word_ngrams: int = 2, char_ngrams: int = 3) -> None:
+        self.dimensions = dimensions
+        self.word_ngrams = word_ngrams
+        self.char_ngrams = char_ngrams
+        self.idf = np.ones(dimensions, dtype=np.float32)
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {
+            "dimensions": self.dimensions,
+            "word_ngrams": self.word_ngrams,
+            "char_ngrams": self.char_ngrams,
+        }
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features = []
+        for n in range(1, self.word_ngrams + 1):
+            for i in range(len(words) - n + 1):
+                features.append(" ".join(words[i : i + n]))
+        if self.char_ngrams:
+            for word in words:
+                padded = f"<{word}>"
+                for i in range(len(padded) - self.char_ngrams + 1):
+                    features.append("#" + padded[i : i + self.char_ngrams])
+        return features
+
+    def _term_frequencies(self, text: str) -> Dict[int, float]:
+        counts: Dict[int, float] = {}
+        for feature in self._features(text):
+            bucket, sign = _bucket(feature, self.dimensions)
+            counts[bucket] = counts.get(bucket, 0.0) + sign
+        return counts
+
+    def document_frequency(self, texts: List[str]) -> np.ndarray:
+        """Per-bucket document counts, which can be summed over parts of a corpus."""
+        document_frequency = np.zeros(self.dimensions, dtype=np.float32)
+        for text in texts:
+            for bucket in self._term_frequencies(text):
+                document_frequency[bucket] += 1
+        return document_frequency
+
+    def fit_counts(self, document_frequency: np.ndarray, num_texts: int) -> "HashingEmbeddings":
+        self.idf = (np.log((1 + num_texts) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self
+
+    def fit(self, texts: List[str]) -> "HashingEmbeddings":
+        return self.fit_counts(self.document_frequency(texts), len(texts))
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for bucket, count in self._term_frequencies(text).items():
+            if count:
+                # sublinear tf, keeping the hashed sign
+                vector[bucket] = math.copysign(1 + math.log(abs(count)), count)
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def save(self, folder: str) -> None:
+        np.save(os.path.join(folder, HASHING_IDF_FILE), self.idf)
+
+    def load(self, folder: str) -> "HashingEmbeddings":
+        self.idf = np.load(os.path.join(folder, HASHING_IDF_FILE))
+        return self
+
+
+class HuggingFaceBackend(Embeddings):
+    """Sentence-transformers model, loaded on the first encode."""
+
+    name = "huggingface"
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+        self._model = None
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name}
+
+    @property
+    def model(self) -> Embeddings:
+        if self._model is None:
+            from langchain.embeddings import HuggingFaceEmbeddings
+
+            self._model = HuggingFaceEmbeddings(
+                model_name=self.model_name, model_kwargs={"device": "cpu"}
+            )
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+
+BACKENDS = {
+    HuggingFaceBackend.name: HuggingFaceBackend,
+    HashingEmbeddings.name: HashingEmbeddings,
+}
+
+
+def create_embeddings(config) -> Embeddings:
+    """Builds the backend selected in the [embeddings] section of the config."""
+    backend = config.get("embeddings", "backend", fallback=HuggingFaceBackend.name)
+    if backend == HuggingFaceBackend.name:
+        return HuggingFaceBackend(config.embedding_model)
+    if backend == HashingEmbeddings.name:
+        return HashingEmbeddings(
+            dimensions=config.getint("embeddings", "dimensions", fallback=1024),
+            word_ngrams=config.getint("embeddings", "word_ngrams", fallback=2),
+            char_ngrams=config.getint("embeddings", "char_ngrams", fallback=3),
+        )
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def save_embeddings_metadata(folder: str, embeddings: Embeddings) -> None:
+    os.makedirs(folder, exist_ok=True)
+    if isinstance(embeddings, HashingEmbeddings):
+        embeddings.save(folder)
+    with open(os.path.join(folder, METADATA_FILE), "w") as f:
+        f.write(
+            json.dumps(
+                {"embedding_backend": embeddings.name, "params": embeddings.params},
+                indent=4,
+            )
+        )
+
+
+def read_embeddings_metadata(folder: str, config) -> Tuple[str, Dict[str, Any]]:
+    """
+    Returns the backend name and params recorded next to an index. Indexes
+    built before the metadata existed use the huggingface model from the config.
+    """
+    try:
+        with open(os.path.join(folder, METADATA_FILE), "r") as f:
+            metadata = json.loads(f.read())
+    except FileNotFoundError:
+        return HuggingFaceBackend.name, {"model_name": config.embedding_model}
+
+    backend = metadata["embedding_backend"]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend in {folder}: {backend}")
+    return backend, metadata["params"]
+
+
+def embeddings_key(folder: str, config) -> str:
+    """
+    Identifies the embeddings an index needs. Indexes with the same key can
+    share one loaded model; fitted backends are tied to their own index.
+    """
+    backend, params = read_embeddings_metadata(folder, config)
+    key = json.dumps({"backend": backend, "params": params}, sort_keys=True)
+    if backend == HashingEmbeddings.name:
+        key += "@" + os.path.abspath(folder)
+    return key
+
+
+def load_embeddings(folder: str, config) -> Embeddings:
+    """
+    Builds the backend recorded in the index metadata, so an index is always
+    queried with the embeddings it was built with.
+    """
+    backend, params = read_embeddings_metadata(folder, config)
+    embeddings = BACKENDS[backend](**params)
+    if isinstance(embeddings, HashingEmbeddings):
+        embeddings.load(folder)
+    return embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps a backend with an LRU cache of query embeddings, safe to share between catalogs."""
+
+    def __init__(self, embeddings: Embeddings, cache_size: int = 1024) -> None:
+        self.embeddings = embeddings
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.embeddings.name
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self.embeddings.params
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                return vector
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self._cache[text] = vector
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
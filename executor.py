@@ -1,4 +1,5 @@
 from typing import Dict, Any
+from cassette import get_cassette
 import server
 import json
 
@@ -8,6 +9,11 @@ class Executor:
         pass
 
     def run(self, function_json) -> Dict[str, Any]:
+        return get_cassette().call(
+            "executor", function_json, lambda: self._call_server(function_json)
+        )
+
+    def _call_server(self, function_json) -> Dict[str, Any]:
         function_name = function_json.get("api_name")
         function_args = function_json.get("arguments")
 
@@ -0,0 +1,91 @@
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentationWatcher:
+    """
+    Polls a catalog's api_documentation directory and reloads only the
+    entries of added, edited and deleted docs in a background thread. The
+    vector database swaps the rebuilt indexes in at once, so queries are
+    never paused and in-flight ones keep their snapshot.
+
+    The first poll compares against what the index was built from, so docs
+    edited, added or deleted before the watcher started are reloaded too.
+    """
+
+    def __init__(self, vector_db, interval: float = 2.0, persist: bool = True) -> None:
+        self.vector_db = vector_db
+        self.interval = interval
+        self.persist = persist
+        self._files = self._indexed_files()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        files = {}
+        for source in self.vector_db.documentation_files():
+            try:
+                stat = os.stat(source)
+            except FileNotFoundError:
+                continue
+            files[source] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def _indexed_files(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        built_at = self.vector_db.built_at
+        if built_at is None:
+            # an index saved without its build time, so trust the docs on disk
+            return self._scan()
+        files = {}
+        for source in self.vector_db.source_chunks:
+            try:
+                stat = os.stat(source)
+            except FileNotFoundError:
+                # deleted since the build, so the next poll removes it
+                files[source] = None
+                continue
+            # docs edited since the build are left out and so count as changed
+            if stat.st_mtime_ns < built_at:
+                files[source] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def poll(self) -> bool:
+        """Reloads the docs that changed since the last poll, returns whether any did."""
+        files = self._scan()
+        changed = [
+            source for source, stat in files.items() if self._files.get(source) != stat
+        ]
+        removed = [source for source in self._files if source not in files]
+        if not changed and not removed:
+            return False
+
+        logger.info(f"Reloading documentation: changed={changed} removed={removed}")
+        self.vector_db.reload_sources(changed, removed, persist=self.persist)
+        self._files = files
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                # keep serving the previous snapshot and retry on the next poll
+                logger.exception("Reloading documentation failed")
+
+    def start(self) -> "DocumentationWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="documentation-watcher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
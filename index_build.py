@@ -0,0 +1,292 @@
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# set in every worker process by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(chunk_size: int, chunk_overlap: int, embeddings=None) -> None:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    _worker["splitter"] = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    _worker["embeddings"] = embeddings
+
+
+def _embed(embeddings, texts: List[str]) -> np.ndarray:
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.array(embeddings.embed_documents(texts), dtype=np.float32)
+
+
+def _concatenate(arrays: List[np.ndarray]) -> np.ndarray:
+    arrays = [array for array in arrays if len(array)]
+    if not arrays:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.concatenate(arrays)
+
+
+def _process_files(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Reads, parses and splits a group of documentation files, and embeds the
+    chunks and query entries when the worker was given embeddings.
+    """
+    from doc_store import parse_api_documentation
+    from retriever import lexical_fields, query_entries
+
+    embeddings = _worker["embeddings"]
+    results = []
+    for path in paths:
+        with open(path, "r") as f:
+            text = f.read()
+        api = parse_api_documentation(text)
+        result = {
+            "source": path,
+            "chunks": _worker["splitter"].split_text(text),
+            "fields": lexical_fields(api),
+            "entries": query_entries(api),
+        }
+        if embeddings is not None:
+            result["vectors"] = _embed(embeddings, result["chunks"])
+            result["entry_vectors"] = _embed(
+                embeddings, [entry for _, entry in result["entries"]]
+            )
+        results.append(result)
+    return results
+
+
+def _count_files(paths: List[str]):
+    """Document frequencies of the chunks of a group of files, for fitting the idf."""
+    embeddings = _worker["embeddings"]
+    chunks = []
+    for path in paths:
+        with open(path, "r") as f:
+            chunks.extend(_worker["splitter"].split_text(f.read()))
+    return embeddings.document_frequency(chunks), len(chunks)
+
+
+class _StoreWriter:
+    """
+    Adds embedded texts to a FAISS store as they arrive. Index types that need
+    training buffer the first train_size vectors and are trained on them.
+    """
+
+    def __init__(self, embeddings, params: Dict[str, Any], train_size: int) -> None:
+        self.embeddings = embeddings
+        self.params = params
+        self.train_size = 0 if params["index_type"] == "flat" else train_size
+        self.store = None
+        self._pending = []
+        self._pending_count = 0
+
+    def add(self, texts: List[str], vectors: np.ndarray, metadatas: List[dict], ids: List[str]) -> None:
+        if not texts:
+            return
+        if self.store is None:
+            self._pending.append((texts, vectors, metadatas, ids))
+            self._pending_count += len(texts)
+            if self._pending_count >= self.train_size:
+                self._create()
+            return
+        self.store.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=ids)
+
+    def _create(self) -> None:
+        from langchain.docstore.in_memory import InMemoryDocstore
+        from langchain.vectorstores import FAISS
+        from vector_index import build_index
+
+        training_vectors = _concatenate([vectors for _, vectors, _, _ in self._pending])
+        index = build_index(training_vectors, self.params)
+        self.store = FAISS(self.embeddings, index, InMemoryDocstore(), {})
+        pending, self._pending = self._pending, []
+        for texts, vectors, metadatas, ids in pending:
+            self.store.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=ids)
+
+    def close(self):
+        if self.store is None and self._pending:
+            self._create()
+        return self.store
+
+
+class IndexBuilder:
+    """
+    Streams a catalog's documentation into its indexes. Files are read,
+    parsed and split in a process pool a few groups at a time, chunks are
+    embedded in batches and added to the FAISS, BM25 and example query
+    indexes as they arrive, so the working set stays bounded by the
+    in-flight groups however large the catalog is. Backends marked parallel
+    embed inside the workers; others, which parallelize internally, embed
+    in this process while the workers split ahead.
+    """
+
+    def __init__(
+        self,
+        vector_db,
+        workers: Optional[int] = None,
+        files_per_task: int = 16,
+        batch_size: int = 256,
+        train_size: int = 20000,
+        progress_interval: float = 5.0,
+    ) -> None:
+        self.vector_db = vector_db
+        self.workers = workers or os.cpu_count() or 1
+        self.files_per_task = files_per_task
+        self.batch_size = batch_size
+        self.train_size = train_size
+        self.progress_interval = progress_interval
+
+    @classmethod
+    def from_config(cls, vector_db) -> "IndexBuilder":
+        config = vector_db.config
+        return cls(
+            vector_db,
+            workers=config.getint("build", "workers", fallback=0),
+            files_per_task=config.getint("build", "files_per_task", fallback=16),
+            batch_size=config.getint("build", "batch_size", fallback=256),
+            train_size=config.getint("build", "train_size", fallback=20000),
+            progress_interval=config.getfloat("build", "progress_interval", fallback=5.0),
+        )
+
+    def _tasks(self, paths: List[str]) -> List[List[str]]:
+        return [
+            paths[i : i + self.files_per_task]
+            for i in range(0, len(paths), self.files_per_task)
+        ]
+
+    def _stream(self, func, tasks: List[List[str]], embeddings=None) -> Iterator[Any]:
+        """Results of func over the tasks in order, with at most 2 * workers in flight."""
+        config = self.vector_db.config
+        initargs = (config.chunk_size, config.chunk_overlap, embeddings)
+        if self.workers == 1:
+            _init_worker(*initargs)
+            for task in tasks:
+                yield func(task)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=initargs
+        ) as pool:
+            tasks = iter(tasks)
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.submit(func, task))
+                if len(pending) >= 2 * self.workers:
+                    break
+            while pending:
+                result = pending.popleft().result()
+                task = next(tasks, None)
+                if task is not None:
+                    pending.append(pool.submit(func, task))
+                yield result
+
+    def _fit(self, embeddings, tasks: List[List[str]]) -> None:
+        document_frequency = np.zeros(embeddings.dimensions, dtype=np.float32)
+        num_chunks = 0
+        for counts, count in self._stream(_count_files, tasks, embeddings):
+            document_frequency += counts
+            num_chunks += count
+        embeddings.fit_counts(document_frequency, num_chunks)
+
+    def _embed_batched(self, embeddings, texts: List[str]) -> np.ndarray:
+        return _concatenate(
+            [
+                _embed(embeddings, texts[i : i + self.batch_size])
+                for i in range(0, len(texts), self.batch_size)
+            ]
+        )
+
+    def build(self) -> Dict[str, Any]:
+        from embeddings import save_embeddings_metadata
+        from lexical_index import BM25Index
+        from vector_index import index_params
+
+        vector_db = self.vector_db
+        embeddings = vector_db.embeddings_model
+        params = index_params(vector_db.config)
+        paths = vector_db.documentation_files()
+        tasks = self._tasks(paths)
+        built_at = time.time_ns()
+        start = time.perf_counter()
+
+        if hasattr(embeddings, "document_frequency"):
+            # the idf is fitted on every chunk before anything can be embedded
+            self._fit(embeddings, tasks)
+
+        in_workers = getattr(embeddings, "parallel", False)
+        chunks_store = _StoreWriter(embeddings, params, self.train_size)
+        query_store = _StoreWriter(embeddings, params, self.train_size)
+        lexical_index = BM25Index()
+        source_chunks = {}
+        stats = {"files": 0, "chunks": 0, "query_entries": 0}
+        last_report = start
+
+        for results in self._stream(
+            _process_files, tasks, embeddings if in_workers else None
+        ):
+            texts, metadatas, ids, fields = [], [], [], []
+            entry_texts, entry_metadatas = [], []
+            for result in results:
+                source = result["source"]
+                chunk_ids = [str(uuid.uuid4()) for _ in result["chunks"]]
+                source_chunks[source] = chunk_ids
+                texts.extend(result["chunks"])
+                metadatas.extend({"source": source} for _ in result["chunks"])
+                ids.extend(chunk_ids)
+                fields.extend([result["fields"]] * len(chunk_ids))
+                entry_texts.extend(entry for _, entry in result["entries"])
+                entry_metadatas.extend(
+                    {"source": source, "kind": kind} for kind, _ in result["entries"]
+                )
+
+            if in_workers:
+                vectors = _concatenate([result["vectors"] for result in results])
+                entry_vectors = _concatenate(
+                    [result["entry_vectors"] for result in results]
+                )
+            else:
+                vectors = self._embed_batched(embeddings, texts)
+                entry_vectors = self._embed_batched(embeddings, entry_texts)
+
+            chunks_store.add(texts, vectors, metadatas, ids)
+            query_store.add(
+                entry_texts,
+                entry_vectors,
+                entry_metadatas,
+                [str(uuid.uuid4()) for _ in entry_texts],
+            )
+            for docstore_id, text, chunk_fields in zip(ids, texts, fields):
+                lexical_index.add(docstore_id, text, chunk_fields)
+
+            stats["files"] += len(results)
+            stats["chunks"] += len(texts)
+            stats["query_entries"] += len(entry_texts)
+            now = time.perf_counter()
+            if now - last_report >= self.progress_interval:
+                last_report = now
+                logger.info(
+                    f"Indexed {stats['files']}/{len(paths)} files, {stats['chunks']} chunks, "
+                    f"{stats['chunks'] / (now - start):.1f} chunks/s"
+                )
+
+        vector_db.db = chunks_store.close()
+        vector_db.query_db = query_store.close()
+        vector_db.lexical_index = lexical_index
+        vector_db.source_chunks = source_chunks
+        vector_db.built_at = built_at
+        vector_db.save()
+        save_embeddings_metadata(vector_db.faiss_data_path, embeddings)
+
+        stats["seconds"] = time.perf_counter() - start
+        stats["chunks_per_s"] = stats["chunks"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+        logger.info(f"Built index: {stats}")
+        return stats
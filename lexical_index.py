@@ -0,0 +1,121 @@
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+LEXICAL_INDEX_FILE = "lexical_index.json"
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9_.:/\-]*")
+_SEPARATORS = re.compile(r"[_.:/\-]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased tokens that keep identifiers like sprint_id or
+    don:core:dvrv-us-1:devo/0:issue/1 whole, followed by their parts so
+    partial matches still score.
+    """
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        token = token.rstrip("_.:/-")
+        tokens.append(token)
+        parts = [part for part in _SEPARATORS.split(token) if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Inverted index over the same chunks as the vector store, keyed by their
+    docstore ids. Structured fields (api name, output and argument names) are
+    counted field_boost times so exact identifier matches dominate.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, field_boost: int = 3) -> None:
+        self.k1 = k1
+        self.b = b
+        self.field_boost = field_boost
+        self.doc_ids: List[str] = []
+        self.lengths: List[int] = []
+        self.total_length = 0
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, doc_id: str, text: str, fields: List[str] = ()) -> None:
+        tokens = tokenize(text)
+        for field in fields:
+            tokens.extend(tokenize(field) * self.field_boost)
+        position = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        for term, count in Counter(tokens).items():
+            self.postings.setdefault(term, []).append((position, count))
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        if not self.doc_ids:
+            return []
+        num_docs = len(self.doc_ids)
+        average_length = self.total_length / num_docs
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, count in postings:
+                length_norm = 1 - self.b + self.b * self.lengths[position] / average_length
+                scores[position] = scores.get(position, 0.0) + idf * count * (
+                    self.k1 + 1
+                ) / (count + self.k1 * length_norm)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[position], score) for position, score in best]
+
+    def save(self, folder: str) -> None:
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, LEXICAL_INDEX_FILE), "w") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "k1": self.k1,
+                        "b": self.b,
+                        "field_boost": self.field_boost,
+                        "doc_ids": self.doc_ids,
+                        "lengths": self.lengths,
+                        "postings": self.postings,
+                    },
+                    separators=(",", ":"),
+                )
+            )
+
+    @classmethod
+    def load(cls, folder: str) -> "BM25Index":
+        with open(os.path.join(folder, LEXICAL_INDEX_FILE), "r") as f:
+            data = json.loads(f.read())
+        index = cls(k1=data["k1"], b=data["b"], field_boost=data["field_boost"])
+        index.doc_ids = data["doc_ids"]
+        index.lengths = data["lengths"]
+        index.total_length = sum(index.lengths)
+        index.postings = {
+            term: [tuple(posting) for posting in postings]
+            for term, postings in data["postings"].items()
+        }
+        return index
+
+    @staticmethod
+    def exists(folder: str) -> bool:
+        return os.path.exists(os.path.join(folder, LEXICAL_INDEX_FILE))
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
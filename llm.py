@@ -0,0 +1,234 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cassette import get_cassette
+from config import get_config
+from profiler import get_profiler
+
+
+def _openai_backend(model: str, temperature: float, component: str):
+    from langchain.llms import OpenAI
+
+    return OpenAI(model_name=model, temperature=temperature)
+
+
+# name -> factory(model, temperature, component) returning a callable(prompt, stop=None),
+# optionally with generate_batch(prompts, stop=None) to answer several prompts in one request
+BACKENDS: Dict[str, Callable[[str, float, str], Any]] = {"openai": _openai_backend}
+
+
+def register_backend(name: str, factory: Callable[[str, float, str], Any]) -> None:
+    BACKENDS[name] = factory
+    # dispatchers hold a client made by the previous factory
+    with _dispatchers_lock:
+        for key in [key for key in _dispatchers if key[0] == name]:
+            del _dispatchers[key]
+
+
+def generate_many(llm, prompts: List[str], stop: Optional[List[str]] = None) -> List[str]:
+    """
+    Answers several prompts through the backend's multi-prompt path: its
+    generate_batch, or langchain's generate for completion models, which
+    sends them in one request. Chat models only take one prompt per
+    request, so their prompts are sent side by side instead.
+    """
+    if len(prompts) == 1:
+        return [llm(prompts[0], stop=stop)]
+    generate_batch = getattr(llm, "generate_batch", None)
+    if generate_batch is not None:
+        return generate_batch(prompts, stop=stop)
+    if type(llm).__module__.startswith("langchain"):
+        from langchain.llms.openai import BaseOpenAI
+
+        if isinstance(llm, BaseOpenAI):
+            result = llm.generate(prompts, stop=stop)
+            return [generations[0].text for generations in result.generations]
+    with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+        return list(pool.map(lambda prompt: llm(prompt, stop=stop), prompts))
+
+
+class BatchDispatcher:
+    """
+    Collects the prompts that concurrent queries send to one backend, for up
+    to max_wait seconds or max_batch prompts, sends each group as one batch
+    and hands every caller its own response. Under load this spends one
+    request and one rate limit interval per batch instead of per prompt.
+    Batches are sent from a pool of max_in_flight threads, so collecting
+    never waits on a request and batching adds at most max_wait of latency.
+    """
+
+    def __init__(
+        self,
+        llm,
+        max_batch: int = 8,
+        max_wait: float = 0.02,
+        request_interval: float = 0.0,
+        max_in_flight: int = 4,
+    ) -> None:
+        self.llm = llm
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.request_interval = request_interval
+        self.stats = {"batches": 0, "prompts": 0}
+        self._queue: List[Tuple[str, Optional[List[str]], Future]] = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._senders = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="llm-batch"
+        )
+        self._stats_lock = threading.Lock()
+
+    def submit(self, prompt: str, stop: Optional[List[str]] = None) -> str:
+        future: Future = Future()
+        with self._condition:
+            self._queue.append((prompt, stop, future))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="llm-dispatcher", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+        return future.result()
+
+    def _next_batch(self) -> List[Tuple[str, Optional[List[str]], Future]]:
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._queue[: self.max_batch]
+            del self._queue[: self.max_batch]
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                # one request can only carry one set of stop sequences
+                groups: Dict[Any, List[Tuple[str, Optional[List[str]], Future]]] = {}
+                for item in batch:
+                    groups.setdefault(tuple(item[1] or ()), []).append(item)
+                for items in groups.values():
+                    self._senders.submit(self._send, items)
+            except BaseException as e:
+                _fail(batch, e)
+
+    def _send(self, items: List[Tuple[str, Optional[List[str]], Future]]) -> None:
+        try:
+            # spaces out requests to stay under the OpenAI rate limit
+            if self.request_interval > 0:
+                time.sleep(self.request_interval)
+            with self._stats_lock:
+                self.stats["batches"] += 1
+                self.stats["prompts"] += len(items)
+            responses = generate_many(
+                self.llm, [prompt for prompt, _, _ in items], stop=items[0][1]
+            )
+            if len(responses) != len(items):
+                raise RuntimeError(
+                    f"Backend returned {len(responses)} responses for {len(items)} prompts"
+                )
+            for (_, _, future), response in zip(items, responses):
+                future.set_result(response)
+        except BaseException as e:
+            _fail(items, e)
+
+
+def _fail(items: List[Tuple[str, Optional[List[str]], Future]], error: BaseException) -> None:
+    # every caller blocks on its future, so none may be left unresolved
+    for _, _, future in items:
+        if not future.done():
+            future.set_exception(error)
+
+
+_dispatchers: Dict[Tuple[str, str, float, str], BatchDispatcher] = {}
+_dispatchers_lock = threading.Lock()
+
+
+def get_dispatcher(
+    backend: str, model: str, temperature: float, component: str
+) -> BatchDispatcher:
+    """One dispatcher, and backend client, per component shared by all queries."""
+    key = (backend, model, temperature, component)
+    with _dispatchers_lock:
+        if key not in _dispatchers:
+            config = get_config()
+            _dispatchers[key] = BatchDispatcher(
+                BACKENDS[backend](model, temperature, component),
+                max_batch=config.getint("llm", "max_batch_size", fallback=8),
+                max_wait=config.getfloat("llm", "max_wait_ms", fallback=20) / 1000,
+                request_interval=config.getfloat(
+                    "openai", "request_interval", fallback=2.0
+                ),
+                max_in_flight=config.getint("llm", "max_in_flight", fallback=4),
+            )
+        return _dispatchers[key]
+
+
+class LLMClient:
+    """
+    Callable wrapper around the configured LLM backend (OpenAI by default) that
+    defers importing langchain and creating the client until the first prompt
+    is sent. Every call goes through the cassette so runs can be recorded and
+    replayed offline. With [llm] batching enabled, prompts go through the
+    component's shared BatchDispatcher instead of one request each.
+    """
+
+    def __init__(self, model: str, temperature: float, component: str = "llm") -> None:
+        config = get_config()
+        self.model = model
+        self.temperature = temperature
+        self.component = component
+        self.backend = config.get("llm", "backend", fallback="openai")
+        self.request_interval = config.getfloat(
+            "openai", "request_interval", fallback=2.0
+        )
+        self.batching = config.getboolean("llm", "batching", fallback=False)
+        self._llm = None
+        self._dispatcher = None
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            factory = BACKENDS[self.backend]
+            self._llm = factory(self.model, self.temperature, self.component)
+        return self._llm
+
+    @property
+    def dispatcher(self) -> BatchDispatcher:
+        if self._dispatcher is None:
+            self._dispatcher = get_dispatcher(
+                self.backend, self.model, self.temperature, self.component
+            )
+        return self._dispatcher
+
+    def _generate(self, prompt: str, stop: Optional[List[str]]) -> str:
+        if self.batching:
+            return self.dispatcher.submit(prompt, stop)
+        # spaces out requests to stay under the OpenAI rate limit
+        if self.request_interval > 0:
+            time.sleep(self.request_interval)
+        return self.llm(prompt, stop=stop)
+
+    def __call__(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        sections: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """
+        :param sections: the values substituted into the prompt template, by
+            variable name, used by the token profiler to attribute prompt tokens.
+        """
+        request = {"component": self.component, "prompt": prompt, "stop": stop}
+        response = get_cassette().call(
+            "llm", request, lambda: self._generate(prompt, stop)
+        )
+        get_profiler().record(self.component, sections or {}, prompt, response)
+        return response
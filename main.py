@@ -1,36 +1,27 @@
 from modules import FinalAPISelector, ArgumentExtractor, SubAPISelector
-from typing import Dict, Any
+from checkpoint import get_checkpoint_store
+from typing import Dict, Any, List
 from executor import Executor
 from result_formatter import ResultFormatter
-from retriever import VectorDataBase
+from catalogs import CatalogRegistry
 from planner import Planner
-from configparser import ConfigParser
-import os
+from profiler import get_profiler
+from speculation import Speculator
+from variable_table import VariableTable
+from config import get_config
 import re
 import json
+import threading
 import time
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 import warnings
 
 warnings.filterwarnings("ignore")
 
-config = ConfigParser()
-config.read("config.ini")
-
-DATA_PATH = config["faiss"]["data"]
-
-OPENAI_SECRET_KEY = config["openai"]["secret_key"]
-MODEL = config["openai"]["model"]
-TEMPERATURE = float(config["openai"]["temperature"])
-
-MAX_EXECUTION_TIME = config["reverse_gpt"]["max_execution_time"]
-MAX_ITERATIONS = config["reverse_gpt"]["max_iterations"]
-
-QUERY = config["query"]["query"]
-
-os.environ["OPENAI_API_KEY"] = OPENAI_SECRET_KEY
+logger = logging.getLogger()
 
 
 def simpleFormatter(context, prev_api_mapping):
@@ -59,60 +50,158 @@ def _should_end(result):
     return False
 
 
-if __name__ == "__main__":
-    vector_db = VectorDataBase()
-    vector_db.load_db()
-
-    logging.basicConfig(
-        level=logging.INFO,
-        filename="logs/run.log",
-        filemode="w",
-        format="%(asctime)s - %(levelname)s - %(message)s",
+def load_components(model: str, temperature: float) -> Dict[str, Any]:
+    return {
+        "api_selector": FinalAPISelector(model, temperature),
+        "argument_extractor": ArgumentExtractor(model, temperature),
+        "sub_api_selector": SubAPISelector(model, temperature),
+        "planner": Planner(model, temperature),
+        "executor": Executor(),
+        "formatter": ResultFormatter(model, temperature),
+    }
+
+
+def run_query(
+    query: str,
+    vector_db,
+    components: Dict[str, Any],
+    run_id: str = None,
+    speculation_stats: Dict[str, int] = None,
+) -> List[Dict[str, Any]]:
+    checkpoints = get_checkpoint_store()
+    if run_id is None:
+        run_id = checkpoints.run_id(query)
+
+    # pin the current indexes so a hot reload mid-query can't mix two catalogs
+    vector_db = vector_db.snapshot()
+
+    speculator = Speculator.from_config(
+        vector_db, components["sub_api_selector"].top_k
     )
-    logger = logging.getLogger()
 
-    query = QUERY
+    profiler = get_profiler()
+    profiler.begin_query(query)
+    try:
+        formatted_result = _run_query(query, vector_db, components, run_id, speculator)
+        checkpoints.delete(run_id)
+        return formatted_result
+    finally:
+        if speculator is not None:
+            stats = speculator.close()
+            logger.info(f"Speculation: {stats}")
+            if speculation_stats is not None:
+                speculation_stats.update(stats)
+        token_profile = profiler.end_query()
+        if token_profile is not None:
+            logger.info(f"Token profile: {token_profile}")
+
+
+def run_batch(
+    queries: List[str], vector_db, model: str, temperature: float, concurrency: int = 8
+) -> List[List[Dict[str, Any]]]:
+    """
+    Runs independent queries side by side, one set of components per worker,
+    so their LLM calls can share batches when [llm] batching is enabled.
+    A failed query gets an empty result instead of stopping the batch.
+    """
+    local = threading.local()
+    checkpoints = get_checkpoint_store()
+
+    def run_one(position: int, query: str) -> List[Dict[str, Any]]:
+        if not hasattr(local, "components"):
+            local.components = load_components(model, temperature)
+        # repeated queries in a batch must not share a checkpoint
+        run_id = checkpoints.run_id(query, position)
+        try:
+            return run_query(query, vector_db, local.components, run_id)
+        except Exception:
+            logger.exception(f"Query failed: {query}")
+            return []
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(run_one, range(len(queries)), queries))
+
+
+def _save_checkpoint(store, run_id, query, plan, planner_history, api_tree):
+    # prev_table and prev_api_mapping are rebuilt from the api_tree outputs on resume,
+    # and a plan of None means the planner call after the last step is still pending
+    store.save(
+        run_id,
+        {
+            "query": query,
+            "plan": plan,
+            "planner_history": planner_history,
+            "api_tree": api_tree,
+        },
+    )
 
-    time_elapsed = 0.0
-    start_time = time.time()
 
-    api_selector = FinalAPISelector(MODEL, TEMPERATURE)
-    argument_extractor = ArgumentExtractor(MODEL, TEMPERATURE)
-    sub_api_selector = SubAPISelector(MODEL, TEMPERATURE)
-    planner = Planner(MODEL, TEMPERATURE)
-    executor = Executor()
-    formatter = ResultFormatter(MODEL, TEMPERATURE)
+def _run_query(
+    query: str,
+    vector_db,
+    components: Dict[str, Any],
+    run_id: str,
+    speculator: Speculator = None,
+) -> List[Dict[str, Any]]:
+    api_selector = components["api_selector"]
+    argument_extractor = components["argument_extractor"]
+    sub_api_selector = components["sub_api_selector"]
+    planner = components["planner"]
+    executor = components["executor"]
+
+    checkpoints = get_checkpoint_store()
+    # the speculator serves prefetched retrievals and forwards the rest
+    db = vector_db if speculator is None else speculator
+
+    prev_table = VariableTable()
+    api_tree = []
+    prev_api_mapping = {}
 
-    planner_history = []
+    checkpoint = checkpoints.load(run_id)
+    if checkpoint is not None:
+        plan = checkpoint["plan"]
+        planner_history = [tuple(step) for step in checkpoint["planner_history"]]
+        api_tree = checkpoint["api_tree"]
+        for api_call_summary in api_tree:
+            sequence_no = api_call_summary["sequence_no"]
+            prev_table.add(sequence_no, api_call_summary["output"])
+            for k, v in api_call_summary["output"].items():
+                prev_api_mapping[k] = (f"$$PREV[{sequence_no}]", v)
+        logger.info(f"Resuming run {run_id} after step {len(api_tree)}")
+        if plan is None:
+            # the last step ran, but the planner call after it didn't finish
+            plan = planner.run(inputs={"input": query, "history": planner_history})
+            logger.info(f"Planner: {plan}")
+            _save_checkpoint(checkpoints, run_id, query, plan, planner_history, api_tree)
+    else:
+        planner_history = []
+
+        if speculator is not None:
+            speculator.speculate_query(query)
+        plan = planner.run(inputs={"input": query, "history": planner_history})
 
-    plan = planner.run(inputs={"input": query, "history": planner_history})
+        logger.info(f'Planner Output: {plan["result"]}')
 
-    logger.info(f'Planner Output: {plan["result"]}')
+        if plan["result"] == "[]":
+            return []
 
-    if plan["result"] == "[]":
-        print("[]")
-        exit()
+        _save_checkpoint(checkpoints, run_id, query, plan, planner_history, api_tree)
 
-    prev_table = {}
-    api_tree = []
-    prev_api_mapping = {}
     while not _should_end(plan["result"]):
         ## getting the root api
-        api = api_selector.select_api_from_query(query=plan["result"], db=vector_db)
+        api = api_selector.select_api_from_query(query=plan["result"], db=db)
         api = json.loads(api)
 
         logger.info(f"API Selector: {api}")
 
         if api == "None":
-            print("[]")
-            exit()
+            return []
 
-        with open(api["data_source"], "r") as f:
-            api_documentation = f.read()
+        api_documentation = argument_extractor.load_documentation(api["data_source"])
 
         arguments = argument_extractor.get_arguments_from_query(
             query=query,
-            db=vector_db,
+            db=db,
             api_documentation=api_documentation,
             api_response_variables=prev_table,
         )
@@ -122,7 +211,7 @@ if __name__ == "__main__":
         if len(arguments) < 5:
             arguments = {}
         else:
-            arguments = json.loads(arguments)
+            arguments = prev_table.resolve(json.loads(arguments))
 
         keys = list(arguments.keys())
         for k in keys:
@@ -140,27 +229,27 @@ if __name__ == "__main__":
         while stack:
             next_required_argument = stack.pop()
             api = sub_api_selector.get_api_from_argument(
-                required_argument=next_required_argument, db=vector_db
+                required_argument=next_required_argument, db=db
             )
             api = json.loads(api)
 
             if api == "None":
-                print("[]")
-                exit()
+                return []
 
             logger.info(f"API Selector: {api}")
 
-            with open(api["data_source"], "r") as f:
-                api_documentation = f.read()
+            api_documentation = argument_extractor.load_documentation(
+                api["data_source"]
+            )
 
             arguments = argument_extractor.get_arguments_from_query(
                 query=query,
-                db=vector_db,
+                db=db,
                 api_documentation=api_documentation,
                 api_response_variables=prev_table,
             )
 
-            arguments = json.loads(arguments)
+            arguments = prev_table.resolve(json.loads(arguments))
 
             keys = list(arguments.keys())
             for k in keys:
@@ -194,24 +283,77 @@ if __name__ == "__main__":
         }
         api_tree.append(api_call_summary)
 
+        prev_table.add(len(api_tree) - 1, response)
         for k, v in response.items():
-            prev_table[k] = v
             prev_api_mapping[k] = (f"$$PREV[{len(api_tree) - 1}]", v)
 
         planner_history.append((plan["result"], execution_response_msg))
+        # save the executed step before planning the next one, so a failed
+        # planner call never repeats the tool call on resume
+        _save_checkpoint(checkpoints, run_id, query, None, planner_history, api_tree)
+        if speculator is not None:
+            # prefetch for the likely next APIs while the planner call is in flight
+            speculator.speculate(api["api_name"], response, prev_table)
         plan = planner.run(inputs={"input": query, "history": planner_history})
 
         logger.info(f"Planner: {plan}")
 
-    time_elapsed = time.time() - start_time
+        _save_checkpoint(checkpoints, run_id, query, plan, planner_history, api_tree)
 
-    #formatted_result = formatter.run(api_tree, prev_table) # code to format using llm
+    #formatted_result = components["formatter"].run(api_tree, prev_table) # code to format using llm
     formatted_result = simpleFormatter(
         api_tree, prev_api_mapping
     )  # Simple formatter does basic mapping
+    return formatted_result
+
+
+if __name__ == "__main__":
+    config = get_config()
+    MODEL = config.model
+    TEMPERATURE = config.temperature
+    QUERY = config.query
+
+    vector_db = CatalogRegistry().get(config.get("query", "catalog", fallback=None))
+
+    logging.basicConfig(
+        level=logging.INFO,
+        filename="logs/run.log",
+        filemode="w",
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
+    query = QUERY
+    batch_file = config.get("query", "batch_file", fallback=None)
+
+    time_elapsed = 0.0
+    start_time = time.time()
+
+    if batch_file:
+        # batch mode: one query per line, results in the same order
+        with open(batch_file, "r") as f:
+            queries = [line.strip() for line in f if line.strip()]
+        formatted_result = run_batch(
+            queries,
+            vector_db,
+            MODEL,
+            TEMPERATURE,
+            concurrency=config.getint("query", "concurrency", fallback=8),
+        )
+    else:
+        components = load_components(MODEL, TEMPERATURE)
+        formatted_result = run_query(query, vector_db, components)
+
+    time_elapsed = time.time() - start_time
+
+    if formatted_result == []:
+        print("[]")
 
     with open("output/output.json", "w") as f:
         f.write(json.dumps(formatted_result, indent=4))
         f.close()
 
     logger.info(f"TIME: {time_elapsed}")
+
+    profiler = get_profiler()
+    if profiler.enabled:
+        profiler.save(config.get("profiler", "output", fallback="logs/token_profile.json"))
@@ -1,32 +1,20 @@
-import os
-import time
-from configparser import ConfigParser
-
-from langchain.llms import OpenAI
-from langchain.prompts import PromptTemplate
-
-config = ConfigParser()
-config.read("config.ini")
-
-OPENAI_SECRET_KEY = config["openai"]["secret_key"]
-MODEL = config["openai"]["model"]
-TEMPERATURE = float(config["openai"]["temperature"])
-
-os.environ["OPENAI_API_KEY"] = OPENAI_SECRET_KEY
+from config import get_config
+from doc_store import documentation_store
+from llm import LLMClient
+from variable_table import VariableTable
 
 
 class ReverseChainBaseClass:
     def __init__(self, model: str, temperature: float) -> None:
         self.model = model
         self.temperature = temperature
-        self.llm = OpenAI(
-            model_name=self.model,
-            temperature=self.temperature,
-        )
+        self.llm = LLMClient(self.model, self.temperature, type(self).__name__)
         self.template = ""
+        self._prompt_template = None
+        self.top_k = get_config().getint("retriever", "final_top_k", fallback=10)
 
     def get_context_from_retriver(self, query: str, db):
-        documents = db.retrieve_using_similarity_search(query, top_k=10)
+        documents = db.retrieve_using_similarity_search(query, top_k=self.top_k)
         if documents is not None:
             _document = []
             for document in documents:
@@ -37,10 +25,24 @@ class ReverseChainBaseClass:
             return context
         return "No similar API Found!"
 
+    def compile_template(self, input_variables):
+        # templates are set by the subclasses after __init__, so compile on first use
+        if (
+            self._prompt_template is None
+            or self._prompt_template.template != self.template
+        ):
+            from langchain.prompts import PromptTemplate
+
+            self._prompt_template = PromptTemplate(
+                input_variables=input_variables, template=self.template
+            )
+        return self._prompt_template
+
+    def load_documentation(self, data_source: str) -> str:
+        return documentation_store.read(data_source)
+
     def get_prompt(self, query: str, context: str) -> str:
-        prompt = PromptTemplate(
-            input_variables=["query", "context"], template=self.template
-        )
+        prompt = self.compile_template(["query", "context"])
         return prompt.format(query=query, context=context)
 
 
@@ -63,10 +65,9 @@ class FinalAPISelector(ReverseChainBaseClass):
         """
 
     def select_api_from_query(self, query: str, db) -> str:
-        time.sleep(2)
-        context = self.get_context_from_retriver(query, db)
-        prompt = self.get_prompt(query, context=context)
-        response = self.llm(prompt)
+        values = {"query": query, "context": self.get_context_from_retriver(query, db)}
+        prompt = self.get_prompt(**values)
+        response = self.llm(prompt, sections=values)
         return response
 
 
@@ -81,6 +82,8 @@ class ArgumentExtractor(ReverseChainBaseClass):
         You are an argument extractor. For each argument, you need to
         determine whether you can extract the value from user input
         directly or from available arguments above or you need to use an API to get the value. 
+        Each available argument is listed as name: type (handle). To use an available argument,
+        put its handle, for example $$PREV[0], as the value instead of the actual value.
         The output should be in Json format, key is the argument, and value is the
         value of argument. Importantly, return "" if you cannot get
         value.
@@ -100,32 +103,29 @@ class ArgumentExtractor(ReverseChainBaseClass):
         Arguments :
         """
 
-    def get_prompt(self, query: str, context: str, api_response_variables) -> str:
-        # print(api_response_variables)
-        prompt = PromptTemplate(
-            input_variables=["query", "context", "api_response_variables"],
-            template=self.template,
-        )
+    def get_prompt(self, query: str, context: str, api_response_variables: str) -> str:
+        prompt = self.compile_template(["query", "context", "api_response_variables"])
         return prompt.format(
             query=query, context=context, api_response_variables=api_response_variables
         )
 
     def get_arguments_from_query(
-        self, query: str, db, api_documentation, api_response_variables
+        self, query: str, db, api_documentation, api_response_variables: VariableTable
     ):
-        time.sleep(2)
-        prompt = self.get_prompt(
-            query=query,
-            context=api_documentation,
-            api_response_variables=api_response_variables,
-        )
-        response = self.llm(prompt)
+        values = {
+            "query": query,
+            "context": api_documentation,
+            "api_response_variables": api_response_variables.to_prompt(),
+        }
+        prompt = self.get_prompt(**values)
+        response = self.llm(prompt, sections=values)
         return response
 
 
 class SubAPISelector(ReverseChainBaseClass):
     def __init__(self, model: str, temperature: float) -> None:
         super().__init__(model, temperature)
+        self.top_k = get_config().getint("retriever", "sub_top_k", fallback=5)
         self.template = """
         Required argument: {required_argument} 
         context: {context}
@@ -136,17 +136,17 @@ class SubAPISelector(ReverseChainBaseClass):
         """
 
     def get_api_from_argument(self, db, required_argument: str) -> str:
-        context = self.get_context_from_retriver(required_argument, db)
-        prompt = self.get_prompt(context=context, required_argument=required_argument)
-        response = self.llm(prompt)
+        values = {
+            "context": self.get_context_from_retriver(required_argument, db),
+            "required_argument": required_argument,
+        }
+        prompt = self.get_prompt(**values)
+        response = self.llm(prompt, sections=values)
         return response
 
     def get_context_from_retriver(self, query: str, db):
-        return db.retrieve_using_similarity_search(query, top_k=5)
+        return db.retrieve_using_similarity_search(query, top_k=self.top_k)
 
     def get_prompt(self, context: str, required_argument: str) -> str:
-        time.sleep(2)
-        prompt = PromptTemplate(
-            input_variables=["context", "required_argument"], template=self.template
-        )
+        prompt = self.compile_template(["context", "required_argument"])
         return prompt.format(context=context, required_argument=required_argument)
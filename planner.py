@@ -1,21 +1,7 @@
 from typing import Any, Dict, List, Optional, Tuple
-import time
 import re
-from configparser import ConfigParser
-import os
 
-from langchain.chains.base import Chain
-from langchain.chains.llm import LLMChain
-from langchain.prompts.prompt import PromptTemplate
-from langchain.llms.base import BaseLLM
-from langchain.llms import OpenAI
-
-
-config = ConfigParser()
-config.read("config.ini")
-
-OPENAI_SECRET_KEY = config["openai"]["secret_key"]
-os.environ["OPENAI_API_KEY"] = OPENAI_SECRET_KEY
+from llm import LLMClient
 
 icl_examples = {
     "devrev": """Example 1:
@@ -96,18 +82,16 @@ Plan step 1: {agent_scratchpad}"""
 
 
 class Planner:
-    llm: BaseLLM
+    llm: LLMClient
     planner_prompt: str
     output_key: str = "result"
 
     def __init__(self, model, temperature, planner_prompt=PLANNER_PROMPT) -> None:
         self.model = model
         self.temperature = temperature
-        self.llm = OpenAI(
-            model_name=self.model,
-            temperature=self.temperature,
-        )
+        self.llm = LLMClient(self.model, self.temperature, "Planner")
         self.planner_prompt = PLANNER_PROMPT
+        self._prompt_template = None
 
     @property
     def _chain_type(self) -> str:
@@ -147,20 +131,28 @@ class Planner:
             scratchpad += self.observation_prefix + execution_res + "\n"
         return scratchpad
 
+    def get_prompt(self, input: str, agent_scratchpad: str) -> str:
+        if self._prompt_template is None:
+            from langchain.prompts.prompt import PromptTemplate
+
+            self._prompt_template = PromptTemplate(
+                template=self.planner_prompt,
+                partial_variables={"icl_examples": icl_examples["devrev"]},
+                input_variables=["input", "agent_scratchpad"],
+            )
+        return self._prompt_template.format(input=input, agent_scratchpad=agent_scratchpad)
+
     def run(self, inputs: Dict[str, List[Tuple[str, str]]]) -> Dict[str, str]:
-        time.sleep(2)
-        scratchpad = self._construct_scratchpad(inputs["history"])
-        # print("Scrachpad: \n", scratchpad)
-        planner_prompt = PromptTemplate(
-            template=self.planner_prompt,
-            partial_variables={
-                "agent_scratchpad": scratchpad,
-                "icl_examples": icl_examples["devrev"],
-            },
-            input_variables=["input"],
+        values = {
+            "input": inputs["input"],
+            "agent_scratchpad": self._construct_scratchpad(inputs["history"]),
+        }
+        prompt = self.get_prompt(**values)
+        planner_chain_output = self.llm(
+            prompt,
+            stop=self._stop,
+            sections={"icl_examples": icl_examples["devrev"], **values},
         )
-        planner_chain = LLMChain(llm=self.llm, prompt=planner_prompt)
-        planner_chain_output = planner_chain.run(input=inputs["input"], stop=self._stop)
 
         planner_chain_output = re.sub(
             r"Plan step \d+: ", "", planner_chain_output
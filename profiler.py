@@ -0,0 +1,203 @@
+import json
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from config import get_config
+
+INSTRUCTIONS = "instructions"
+
+_profiler = None
+_lock = threading.Lock()
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Counts tokens with tiktoken when it is installed, otherwise approximates them."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def _slope(values: List[int]) -> float:
+    n = len(values)
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    variance = sum((x - mean_x) ** 2 for x in range(n))
+    if variance == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values)) / variance
+
+
+class QueryProfile:
+    def __init__(self, query: Optional[str]) -> None:
+        self.query = query
+        self.calls: List[Dict[str, Any]] = []
+
+    def summary(self, profiler: "TokenProfiler") -> Dict[str, Any]:
+        return {"query": self.query, **profiler.aggregate(self.calls)}
+
+
+class TokenProfiler:
+    """
+    Counts prompt tokens per template section and per component for every LLM
+    call, grouped by query, and flags sections whose size grows with the step
+    count of a query.
+
+    The "instructions" section is the static template text, i.e. the prompt
+    tokens not accounted for by any template variable. Only the last
+    max_queries queries are kept, so a long-lived process doesn't grow.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        prompt_cost_per_1k: float = 0.0,
+        completion_cost_per_1k: float = 0.0,
+        growth_threshold: float = 5.0,
+        max_queries: int = 1000,
+    ) -> None:
+        self.enabled = enabled
+        self.prompt_cost_per_1k = prompt_cost_per_1k
+        self.completion_cost_per_1k = completion_cost_per_1k
+        self.growth_threshold = growth_threshold
+        self.queries = deque(maxlen=max_queries)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def begin_query(self, query: str) -> None:
+        if not self.enabled:
+            return
+        profile = QueryProfile(query)
+        self._local.query = profile
+        with self._lock:
+            self.queries.append(profile)
+
+    def end_query(self) -> Optional[Dict[str, Any]]:
+        profile = getattr(self._local, "query", None)
+        if profile is None:
+            return None
+        self._local.query = None
+        return profile.summary(self)
+
+    def record(
+        self, component: str, sections: Dict[str, str], prompt: str, completion: str
+    ) -> None:
+        if not self.enabled:
+            return
+        profile = getattr(self._local, "query", None)
+        if profile is None:
+            profile = QueryProfile(None)
+            with self._lock:
+                self.queries.append(profile)
+
+        section_tokens = {name: count_tokens(str(text)) for name, text in sections.items()}
+        prompt_tokens = count_tokens(prompt)
+        section_tokens[INSTRUCTIONS] = max(0, prompt_tokens - sum(section_tokens.values()))
+        step = sum(1 for call in profile.calls if call["component"] == component)
+        profile.calls.append(
+            {
+                "component": component,
+                "step": step,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": count_tokens(completion),
+                "sections": section_tokens,
+            }
+        )
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (
+            prompt_tokens * self.prompt_cost_per_1k
+            + completion_tokens * self.completion_cost_per_1k
+        ) / 1000
+
+    def aggregate(self, calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+        components: Dict[str, Dict[str, Any]] = {}
+        for call in calls:
+            totals = components.setdefault(
+                call["component"],
+                {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "sections": {}},
+            )
+            totals["calls"] += 1
+            totals["prompt_tokens"] += call["prompt_tokens"]
+            totals["completion_tokens"] += call["completion_tokens"]
+            for name, tokens in call["sections"].items():
+                totals["sections"][name] = totals["sections"].get(name, 0) + tokens
+
+        prompt_tokens = sum(c["prompt_tokens"] for c in components.values())
+        completion_tokens = sum(c["completion_tokens"] for c in components.values())
+        return {
+            "calls": len(calls),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost": self.cost(prompt_tokens, completion_tokens),
+            "components": components,
+        }
+
+    def growing_sections(self) -> List[Dict[str, Any]]:
+        """Sections whose token count rises by more than growth_threshold per step."""
+        slopes: Dict[tuple, List[float]] = {}
+        with self._lock:
+            queries = list(self.queries)
+        for profile in queries:
+            series: Dict[tuple, List[int]] = {}
+            for call in profile.calls:
+                for name, tokens in call["sections"].items():
+                    series.setdefault((call["component"], name), []).append(tokens)
+            for key, values in series.items():
+                if len(values) >= 3:
+                    slopes.setdefault(key, []).append(_slope(values))
+
+        growing = []
+        for (component, section), values in slopes.items():
+            slope = sum(values) / len(values)
+            if slope > self.growth_threshold:
+                growing.append(
+                    {"component": component, "section": section, "tokens_per_step": slope}
+                )
+        return sorted(growing, key=lambda g: g["tokens_per_step"], reverse=True)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            queries = list(self.queries)
+        calls = [call for profile in queries for call in profile.calls]
+        return {
+            **self.aggregate(calls),
+            "queries": [profile.summary(self) for profile in queries],
+            "growing_sections": self.growing_sections(),
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            f.write(json.dumps(self.summary(), indent=4))
+
+
+def get_profiler() -> TokenProfiler:
+    global _profiler
+    if _profiler is None:
+        with _lock:
+            if _profiler is None:
+                config = get_config()
+                _profiler = TokenProfiler(
+                    enabled=config.getboolean("profiler", "enabled", fallback=False),
+                    prompt_cost_per_1k=config.getfloat(
+                        "profiler", "prompt_cost_per_1k", fallback=0.0
+                    ),
+                    completion_cost_per_1k=config.getfloat(
+                        "profiler", "completion_cost_per_1k", fallback=0.0
+                    ),
+                    growth_threshold=config.getfloat(
+                        "profiler", "growth_threshold", fallback=5.0
+                    ),
+                    max_queries=config.getint("profiler", "max_queries", fallback=1000),
+                )
+    return _profiler
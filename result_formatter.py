@@ -1,24 +1,9 @@
-import os
-from configparser import ConfigParser
-
-from langchain.llms import OpenAI
-from langchain.prompts import PromptTemplate
-
 from modules import ReverseChainBaseClass
 
 import warnings
 
 warnings.filterwarnings("ignore")
 
-config = ConfigParser()
-config.read("config.ini")
-
-OPENAI_SECRET_KEY = config["openai"]["secret_key"]
-MODEL = config["openai"]["model"]
-TEMPERATURE = float(config["openai"]["temperature"])
-
-os.environ["OPENAI_API_KEY"] = OPENAI_SECRET_KEY
-
 
 class ResultFormatterBaseClass(ReverseChainBaseClass):
     def __init__(self, model, temperature) -> None:
@@ -73,12 +58,13 @@ class ResultFormatter(ResultFormatterBaseClass):
         """
 
     def get_prompt(self, context: str, api_result_mapping) -> str:
-        prompt = PromptTemplate(input_variables=["context"], template=self.template)
+        prompt = self.compile_template(["context"])
         return prompt.format(context=context, api_result_mapping=api_result_mapping)
 
     def _format(self, context, api_result_mapping):
-        prompt = self.get_prompt(context=context, api_result_mapping=api_result_mapping)
-        response = self.llm(prompt)
+        values = {"context": context, "api_result_mapping": api_result_mapping}
+        prompt = self.get_prompt(**values)
+        response = self.llm(prompt, sections=values)
         return response
 
     def run(self, context, api_result_mapping):
@@ -1,58 +1,397 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.document_loaders import TextLoader, DirectoryLoader
-from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
-
-from configparser import ConfigParser
+from config import get_config
+from lexical_index import reciprocal_rank_fusion
+import copy
+import json
 import os
+import threading
+import time
+from pathlib import Path
 
-config = ConfigParser()
-config.read("config.ini")
+QUERY_INDEX_DIRECTORY = "example_queries"
+BUILD_FILE = "build.json"
 
-DATA_PATH = config["faiss"]["data"]
-FAISS_DATA_PATH = config["faiss"]["faiss_data_path"]
-CHUNK_SIZE = int(config["faiss"]["chunk_size"])
-CHUNK_OVERLAP = int(config["faiss"]["chunk_overlap"])
 
-EMBEDDING_MODEL = config["huggingface"]["embedding_model"]
+def lexical_fields(api):
+    """Structured fields of a parsed API that BM25 boosts."""
+    return (
+        [api["api_name"]]
+        + api["outputs"]
+        + [argument["argument_name"] for argument in api["arguments"]]
+    )
 
 
-class VectorDataBase(FAISS):
-    def __init__(self) -> None:
-        self.embeddings_model = HuggingFaceEmbeddings(
-            model_name=EMBEDDING_MODEL, model_kwargs={"device": "cpu"}
-        )
-        self.data_directory = os.path.join(DATA_PATH, "api_documentation")
+def query_entries(api):
+    """(kind, text) pairs indexed as separate vectors for multi-vector retrieval."""
+    entries = [("name", api["api_name"].replace("_", " "))]
+    entries.append(("description", api["api_description"]))
+    entries.extend(("example_query", query) for query in api["example_queries"])
+    return [(kind, entry) for kind, entry in entries if entry]
+
+
+class VectorDataBase:
+    """
+    :param catalog: name of the API catalog to use, None for the default one.
+    :param embeddings: embeddings to query the loaded index with, so several
+        catalogs can share one model. By default they are loaded from the
+        index metadata.
+    """
+
+    def __init__(self, catalog: str = None, embeddings=None) -> None:
+        self.config = get_config()
+        self.catalog = catalog
+        data_path, self.faiss_data_path = self.config.catalog_paths(catalog)
+        self.data_directory = os.path.join(data_path, "api_documentation")
+        self._shared_embeddings = embeddings
+        self._embeddings_model = None
         self.db = None
+        self.lexical_index = None
+        # time_ns just before the indexed docs were read, None if unknown
+        self.built_at = None
+        self.hybrid = self.config.getboolean("retriever", "hybrid", fallback=True)
+        self.lexical_min_score = self.config.getfloat(
+            "retriever", "lexical_min_score", fallback=5.0
+        )
+        self.lexical_margin = self.config.getfloat(
+            "retriever", "lexical_margin", fallback=1.5
+        )
+        self.lexical_candidates = self.config.getint(
+            "retriever", "lexical_candidates", fallback=4
+        )
+        self.rrf_k = self.config.getint("retriever", "rrf_k", fallback=60)
+        self.query_db = None
+        self.source_chunks = {}
+        self.multi_vector = self.config.getboolean(
+            "retriever", "multi_vector", fallback=True
+        )
+        self.multi_vector_candidates = self.config.getint(
+            "retriever", "multi_vector_candidates", fallback=4
+        )
+        # reloads build new indexes under _reload_lock and only hold
+        # _swap_lock to publish them, so reads never wait on a rebuild
+        self._reload_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        # shared with snapshots, holds the parsed catalog of one source_chunks
+        self._api_catalog_cache = {}
+
+    @property
+    def embeddings_model(self):
+        if self._embeddings_model is None:
+            from embeddings import create_embeddings
+
+            self._embeddings_model = create_embeddings(self.config)
+        return self._embeddings_model
 
     def load_db(self):
-        self.db = FAISS.load_local(FAISS_DATA_PATH, self.embeddings_model)
+        from langchain.vectorstores import FAISS
+        from embeddings import CachedEmbeddings, load_embeddings
+        from lexical_index import BM25Index
+        from vector_index import apply_search_params, index_params
 
-    def txt_loader(self) -> DirectoryLoader:
-        loader = DirectoryLoader(
-            path=self.data_directory, glob="*.txt", loader_cls=TextLoader
-        )
+        if self._shared_embeddings is not None:
+            self._embeddings_model = self._shared_embeddings
+        else:
+            # always query with the backend the index was built with
+            self._embeddings_model = CachedEmbeddings(
+                load_embeddings(self.faiss_data_path, self.config),
+                self.config.getint("embeddings", "query_cache_size", fallback=1024),
+            )
+        self.db = FAISS.load_local(self.faiss_data_path, self._embeddings_model)
+        apply_search_params(self.db.index, index_params(self.config))
+        if self.hybrid and BM25Index.exists(self.faiss_data_path):
+            self.lexical_index = BM25Index.load(self.faiss_data_path)
 
-        return loader
+        query_data_path = os.path.join(self.faiss_data_path, QUERY_INDEX_DIRECTORY)
+        if self.multi_vector and os.path.exists(query_data_path):
+            self.query_db = FAISS.load_local(query_data_path, self._embeddings_model)
+            apply_search_params(self.query_db.index, index_params(self.config))
+        self.source_chunks = self._map_sources_to_chunks()
+
+        build_path = os.path.join(self.faiss_data_path, BUILD_FILE)
+        if os.path.exists(build_path):
+            with open(build_path, "r") as f:
+                self.built_at = json.loads(f.read())["built_at"]
+
+    def split_documents(self, documents):
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-    def create_vector_db(self):
-        loader = self.txt_loader()
-        documents = loader.load()
         splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
+            chunk_size=self.config.chunk_size,
+            chunk_overlap=self.config.chunk_overlap,
         )
-        text = splitter.split_documents(documents)
+        return splitter.split_documents(documents)
 
-        self.db = FAISS.from_documents(documents=text, embedding=self.embeddings_model)
-
-        self.db.save_local(FAISS_DATA_PATH)
+    def create_vector_db(self):
+        """Builds and saves every index of the catalog, see index_build.IndexBuilder."""
+        from index_build import IndexBuilder
 
+        IndexBuilder.from_config(self).build()
         return self.db
 
+    def save(self):
+        self.db.save_local(self.faiss_data_path)
+        if self.lexical_index is not None:
+            self.lexical_index.save(self.faiss_data_path)
+        if self.query_db is not None:
+            self.query_db.save_local(
+                os.path.join(self.faiss_data_path, QUERY_INDEX_DIRECTORY)
+            )
+        if self.built_at is not None:
+            with open(os.path.join(self.faiss_data_path, BUILD_FILE), "w") as f:
+                f.write(json.dumps({"built_at": self.built_at}))
+
+    def _query_entries(self, sources):
+        from doc_store import documentation_store, parse_api_documentation
+
+        texts, metadatas = [], []
+        for source in sorted(sources):
+            api = parse_api_documentation(documentation_store.read(source))
+            for kind, entry in query_entries(api):
+                texts.append(entry)
+                metadatas.append({"source": source, "kind": kind})
+        return texts, metadatas
+
+    def _map_sources_to_chunks(self, db=None):
+        db = self.db if db is None else db
+        source_chunks = {}
+        for position in sorted(db.index_to_docstore_id):
+            docstore_id = db.index_to_docstore_id[position]
+            source = db.docstore.search(docstore_id).metadata["source"]
+            source_chunks.setdefault(source, []).append(docstore_id)
+        return source_chunks
+
+    def build_lexical_index(self, db=None):
+        from doc_store import documentation_store, parse_api_documentation
+        from lexical_index import BM25Index
+
+        db = self.db if db is None else db
+        lexical_index = BM25Index()
+        fields = {}
+        for docstore_id in db.index_to_docstore_id.values():
+            document = db.docstore.search(docstore_id)
+            source = document.metadata["source"]
+            if source not in fields:
+                api = parse_api_documentation(documentation_store.read(source))
+                fields[source] = lexical_fields(api)
+            lexical_index.add(docstore_id, document.page_content, fields[source])
+        return lexical_index
+
+    def snapshot(self) -> "VectorDataBase":
+        """
+        A view of the current indexes that later reloads don't change, so a
+        query sees the same catalog from its first retrieval to its last.
+        """
+        with self._swap_lock:
+            return copy.copy(self)
+
+    def _copy_store(self, store, removed_ids):
+        """
+        Copy of a FAISS store without the chunks in removed_ids, leaving the
+        original untouched for the readers still using it.
+        """
+        import faiss
+        import numpy as np
+        from langchain.docstore.in_memory import InMemoryDocstore
+        from langchain.vectorstores import FAISS
+        from vector_index import apply_search_params, index_params
+
+        store = FAISS(
+            store.embedding_function,
+            faiss.clone_index(store.index),
+            InMemoryDocstore(dict(store.docstore._dict)),
+            dict(store.index_to_docstore_id),
+        )
+        apply_search_params(store.index, index_params(self.config))
+        if not removed_ids:
+            return store
+
+        # only flat indexes compact their positions on remove_ids: ivf and pq
+        # keep the original ids and hnsw can't remove at all, so the kept
+        # vectors are re-added in order to the emptied, still trained index
+        removed = set(removed_ids)
+        kept = [
+            (position, docstore_id)
+            for position, docstore_id in sorted(store.index_to_docstore_id.items())
+            if docstore_id not in removed
+        ]
+        index = store.index
+        try:
+            faiss.extract_index_ivf(index).make_direct_map()
+        except RuntimeError:
+            pass
+        vectors = index.reconstruct_n(0, index.ntotal)
+        vectors = np.ascontiguousarray(vectors[[position for position, _ in kept]])
+        index.reset()
+        if len(vectors):
+            index.add(vectors)
+        store.docstore.delete(list(removed))
+        store.index_to_docstore_id = {
+            position: docstore_id for position, (_, docstore_id) in enumerate(kept)
+        }
+        return store
+
+    def _add_to_store(self, store, texts, metadatas):
+        if texts:
+            vectors = self.embeddings_model.embed_documents(texts)
+            store.add_embeddings(zip(texts, vectors), metadatas=metadatas)
+
+    def reload_sources(self, changed, removed=(), persist: bool = False):
+        """
+        Re-embeds only the chunks of the changed (edited or new) and removed
+        documentation files into copies of the current indexes, then swaps
+        the copies in at once. The BM25 index is rebuilt from the new chunks
+        since it needs no embeddings.
+        """
+        from langchain.document_loaders import TextLoader
+        from doc_store import documentation_store
+
+        with self._reload_lock:
+            built_at = time.time_ns()
+            stale = set(changed) | set(removed)
+            for source in stale:
+                documentation_store.invalidate(source)
+
+            documents = []
+            for source in sorted(changed):
+                documents.extend(TextLoader(source).load())
+            chunks = self.split_documents(documents)
+
+            db = self._copy_store(
+                self.db,
+                [
+                    docstore_id
+                    for source in stale
+                    for docstore_id in self.source_chunks.get(source, [])
+                ],
+            )
+            self._add_to_store(
+                db,
+                [chunk.page_content for chunk in chunks],
+                [chunk.metadata for chunk in chunks],
+            )
+            source_chunks = self._map_sources_to_chunks(db)
+            lexical_index = None
+            if self.lexical_index is not None:
+                lexical_index = self.build_lexical_index(db)
+
+            query_db = None
+            if self.query_db is not None:
+                query_db = self._copy_store(
+                    self.query_db,
+                    [
+                        docstore_id
+                        for docstore_id in self.query_db.index_to_docstore_id.values()
+                        if self.query_db.docstore.search(docstore_id).metadata["source"]
+                        in stale
+                    ],
+                )
+                self._add_to_store(
+                    query_db, *self._query_entries(set(changed) & set(source_chunks))
+                )
+
+            with self._swap_lock:
+                self.db = db
+                self.lexical_index = lexical_index
+                self.query_db = query_db
+                self.source_chunks = source_chunks
+                self.built_at = built_at
+            if persist:
+                self.snapshot().save()
+
+    def api_catalog(self):
+        """Parsed documentation of every indexed API, keyed by source."""
+        from doc_store import documentation_store, parse_api_documentation
+
+        source_chunks = self.source_chunks
+        cached = self._api_catalog_cache.get("catalog")
+        if cached is None or cached[0] is not source_chunks:
+            catalog = {
+                source: parse_api_documentation(documentation_store.read(source))
+                for source in sorted(source_chunks)
+            }
+            cached = (source_chunks, catalog)
+            self._api_catalog_cache["catalog"] = cached
+        return cached[1]
+
+    def documentation_files(self):
+        # same paths as the sources recorded by the DirectoryLoader at build time
+        return [str(path) for path in sorted(Path(self.data_directory).glob("*.txt"))]
+
+    def _dense_search(self, query: str, top_k: int):
+        import numpy as np
+
+        vector = np.array([self.db._embed_query(query)], dtype=np.float32)
+        _, positions = self.db.index.search(vector, top_k)
+        return [
+            self.db.index_to_docstore_id[position]
+            for position in positions[0]
+            if position != -1
+        ]
+
+    def _multi_vector_search(self, query: str, top_k: int):
+        """
+        Ranks APIs by their closest example query, description or name vector
+        (max-sim per API) and returns the chunks of the best APIs.
+        """
+        import numpy as np
+
+        vector = np.array([self.query_db._embed_query(query)], dtype=np.float32)
+        _, positions = self.query_db.index.search(
+            vector, top_k * self.multi_vector_candidates
+        )
+        ranking, seen = [], set()
+        for position in positions[0]:
+            if position == -1:
+                continue
+            docstore_id = self.query_db.index_to_docstore_id[position]
+            source = self.query_db.docstore.search(docstore_id).metadata["source"]
+            # results come back nearest first, so the first hit per API is its max-sim
+            if source in seen:
+                continue
+            seen.add(source)
+            ranking.extend(self.source_chunks.get(source, []))
+        return ranking[:top_k]
+
+    def _dense_ranking(self, query: str, top_k: int):
+        if self.query_db is not None:
+            return self._multi_vector_search(query, top_k)
+        return self._dense_search(query, top_k)
+
+    def _lexical_is_confident(self, results) -> bool:
+        """
+        Compares the best BM25 score of each API, so that several chunks of
+        the winning API don't count as a close runner-up.
+        """
+        scores = {}
+        for docstore_id, score in results:
+            source = self.db.docstore.search(docstore_id).metadata["source"]
+            scores.setdefault(source, score)
+        scores = list(scores.values())
+        if not scores or scores[0] < self.lexical_min_score:
+            return False
+        return len(scores) == 1 or scores[0] >= self.lexical_margin * scores[1]
+
     def retrieve_using_similarity_search(self, query: str, top_k: int = 5):
-        if self.db is not None:
-            return self.db.similarity_search(query, k=top_k)
+        if self.db is None:
+            return None
+        if self.lexical_index is None:
+            if self.query_db is None:
+                return self.db.similarity_search(query, k=top_k)
+            ranking = self._multi_vector_search(query, top_k)
+            return [self.db.docstore.search(docstore_id) for docstore_id in ranking]
+
+        lexical = self.lexical_index.search(query, top_k * self.lexical_candidates)
+        if self._lexical_is_confident(lexical):
+            # a clear exact-token match, so skip the embedding model entirely
+            ranking = [docstore_id for docstore_id, _ in lexical]
+        else:
+            ranking = reciprocal_rank_fusion(
+                [
+                    [docstore_id for docstore_id, _ in lexical[:top_k]],
+                    self._dense_ranking(query, top_k),
+                ],
+                k=self.rrf_k,
+            )
+        return [self.db.docstore.search(docstore_id) for docstore_id in ranking[:top_k]]
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
+import random
 import uuid
-import numpy as np
 
 
 def add_work_items_to_sprint(work_ids, sprint_id):
@@ -29,7 +29,7 @@ def create_actionable_tasks_from_text(text):
     :param text: The text from which the actionable insights need to be created.
     :return: work_ids: list of work items created from the text.
     """
-    work_ids = [uuid.uuid1().hex for _ in range(np.random.randint(1, 10))]
+    work_ids = [uuid.uuid1().hex for _ in range(random.randint(1, 9))]
 
     return {
         "work_ids": work_ids,
@@ -51,7 +51,7 @@ def get_similar_work_items(work_id):
     Example:
         get_similar_work_items("12345")
     """
-    work_ids = [uuid.uuid1().hex for _ in range(np.random.randint(1, 10))]
+    work_ids = [uuid.uuid1().hex for _ in range(random.randint(1, 9))]
     return {
         "work_ids": work_ids,
         "status": 200,
@@ -93,7 +93,7 @@ def prioritize_objects(objects):
     Example:
         prioritize_objects(["object3", "object1", "object2"])
     """
-    prioritize_objects = [uuid.uuid1().hex for _ in range(np.random.randint(1, 3))]
+    prioritize_objects = [uuid.uuid1().hex for _ in range(random.randint(1, 2))]
     return {
         "prioritized_objects": prioritize_objects,
         "status": 200,
@@ -213,7 +213,7 @@ def work_list(
     Example:
         work_list(applies_to_part=["part1", "part2"], created_by=["user1"], issue_priority=["p1", "p2"], limit=10)
     """
-    work_items = [uuid.uuid1().hex for _ in range(np.random.randint(1, 3))]
+    work_items = [uuid.uuid1().hex for _ in range(random.randint(1, 2))]
     return {
         "work_items": work_items,
         "status": 200,
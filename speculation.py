@@ -0,0 +1,178 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+from config import get_config
+from doc_store import documentation_store
+from lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
+def _terms(name: str) -> FrozenSet[str]:
+    # compare identifiers by their parts with plurals folded, so work_ids links to work_id
+    return frozenset(term[:-1] if term.endswith("s") else term for term in tokenize(name))
+
+
+class Speculator:
+    """
+    Guesses the next APIs from the catalog's output -> input links while the
+    planner call is in flight, and prefetches their docs and the retrievals
+    the sub API selector would run for their missing arguments. It stands in
+    for the vector database: a lookup that matches a prefetch is served from
+    it, anything else goes to the database, and unused prefetches are dropped
+    at the next step.
+    """
+
+    def __init__(self, vector_db, top_k: int, max_apis: int = 3, workers: int = 2) -> None:
+        self.vector_db = vector_db
+        self.top_k = top_k
+        self.max_apis = max_apis
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speculation")
+        self._prefetched: Dict[Tuple[str, int], Future] = {}
+        self._generation = 0
+        self._closed = False
+        self._argument_names = None
+        self._lock = threading.Lock()
+        self.stats = {"speculations": 0, "prefetched": 0, "hits": 0, "misses": 0, "wasted": 0}
+
+    @classmethod
+    def from_config(cls, vector_db, top_k: int):
+        """Returns a speculator when [speculation] is enabled, else None."""
+        config = get_config()
+        if not config.getboolean("speculation", "enabled", fallback=False):
+            return None
+        return cls(
+            vector_db,
+            top_k,
+            max_apis=config.getint("speculation", "max_apis", fallback=3),
+            workers=config.getint("speculation", "workers", fallback=2),
+        )
+
+    def predict(self, api_name: str, outputs: List[str]) -> List[Dict[str, Any]]:
+        """APIs whose arguments best match the outputs of the last executed API."""
+        catalog = self.vector_db.api_catalog()
+        output_terms = set()
+        for output in outputs:
+            output_terms |= _terms(output)
+        for api in catalog.values():
+            if api["api_name"] == api_name:
+                for output in api["outputs"]:
+                    output_terms |= _terms(output)
+
+        scored = []
+        for source, api in catalog.items():
+            if api["api_name"] == api_name:
+                continue
+            score = sum(
+                len(_terms(argument["argument_name"]) & output_terms)
+                for argument in api["arguments"]
+            )
+            if score:
+                scored.append((score, source, api))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [dict(api, data_source=source) for _, source, api in scored[: self.max_apis]]
+
+    def predict_from_query(self, query: str) -> List[Dict[str, Any]]:
+        """APIs retrieved for the user query itself, for the first step where no API has run yet."""
+        catalog = self.vector_db.api_catalog()
+        apis = []
+        for document in self.vector_db.retrieve_using_similarity_search(query, top_k=self.max_apis) or []:
+            source = document.metadata["source"]
+            if source in catalog and source not in [api["data_source"] for api in apis]:
+                apis.append(dict(catalog[source], data_source=source))
+        return apis
+
+    def speculate(self, api_name: str, response: Dict[str, Any], variables) -> None:
+        """
+        Starts prefetching in the background for the step after api_name,
+        given its response and the variable table of the previous outputs.
+        """
+        available = set(variables.names()) | set(response)
+        self._start(lambda: self.predict(api_name, list(response)), available)
+
+    def speculate_query(self, query: str) -> None:
+        """Starts prefetching for the first step while the initial plan is made."""
+        self._start(lambda: self.predict_from_query(query), set())
+
+    def _start(self, predict, available) -> None:
+        generation = self._drop()
+        with self._lock:
+            if self._closed or generation != self._generation:
+                return
+            self.stats["speculations"] += 1
+            self._pool.submit(self._speculate, generation, predict, available)
+
+    def _speculate(self, generation: int, predict, available) -> None:
+        try:
+            for api in predict():
+                with self._lock:
+                    # the step already moved on or the speculator was closed,
+                    # so this guess is stale
+                    if generation != self._generation:
+                        return
+                    self._pool.submit(documentation_store.read, api["data_source"])
+                for argument in api["arguments"]:
+                    name = argument["argument_name"]
+                    if not argument["required"] or name in available:
+                        continue
+                    with self._lock:
+                        if generation != self._generation:
+                            return
+                        key = (name, self.top_k)
+                        if key not in self._prefetched:
+                            self._prefetched[key] = self._pool.submit(
+                                self.vector_db.retrieve_using_similarity_search,
+                                name,
+                                self.top_k,
+                            )
+                            self.stats["prefetched"] += 1
+        except Exception:
+            logger.exception("Speculation failed")
+
+    def _drop(self) -> int:
+        with self._lock:
+            for future in self._prefetched.values():
+                future.cancel()
+            self.stats["wasted"] += len(self._prefetched)
+            self._prefetched = {}
+            self._generation += 1
+            return self._generation
+
+    def _speculable(self, query: str, top_k: int) -> bool:
+        """Whether a lookup is one speculation prefetches: an argument name at the sub selector's top_k."""
+        if top_k != self.top_k:
+            return False
+        if self._argument_names is None:
+            self._argument_names = {
+                argument["argument_name"]
+                for api in self.vector_db.api_catalog().values()
+                for argument in api["arguments"]
+            }
+        return query in self._argument_names
+
+    def retrieve_using_similarity_search(self, query: str, top_k: int = 5):
+        # lookups never wait for a guess that hasn't been made yet
+        with self._lock:
+            future = self._prefetched.pop((query, top_k), None)
+        if future is not None:
+            try:
+                result = future.result()
+                self.stats["hits"] += 1
+                return result
+            except Exception:
+                logger.exception("Speculative retrieval failed")
+        # retrievals with the planner's output, which can't be guessed, don't count
+        if self._speculable(query, top_k):
+            self.stats["misses"] += 1
+        return self.vector_db.retrieve_using_similarity_search(query, top_k=top_k)
+
+    def close(self) -> Dict[str, int]:
+        with self._lock:
+            self._closed = True
+        self._drop()
+        self._pool.shutdown(wait=False)
+        return self.stats
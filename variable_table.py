@@ -0,0 +1,87 @@
+import json
+from typing import Any, Dict, List
+
+HANDLE_PREFIX = "$$PREV"
+MAX_PREVIEW_CHARS = 40
+
+
+class VariableTable:
+    """
+    Holds the outputs of previously executed APIs and presents them to the
+    argument extractor as typed handles instead of raw values, so the prompt
+    stays the same size no matter how large the tool outputs get.
+    """
+
+    def __init__(self) -> None:
+        self._variables: Dict[str, Dict[str, Any]] = {}
+        self._handles: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._variables)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._variables
+
+    def add(self, sequence_no: int, response: Dict[str, Any]) -> None:
+        for name, value in response.items():
+            if len(response) == 1:
+                handle = f"{HANDLE_PREFIX}[{sequence_no}]"
+            else:
+                handle = f"{HANDLE_PREFIX}[{sequence_no}].{name}"
+            self._variables[name] = {"handle": handle, "value": value}
+            self._handles[handle] = value
+
+    def names(self) -> List[str]:
+        return list(self._variables)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: entry["value"] for name, entry in self._variables.items()}
+
+    def to_prompt(self) -> str:
+        if not self._variables:
+            return "None"
+        lines = []
+        for name, entry in self._variables.items():
+            lines.append(f"{name}: {_describe(entry['value'], entry['handle'])}")
+        return "\n".join(lines)
+
+    def resolve(self, arguments: Any) -> Any:
+        """Replaces every handle in the extracted arguments with its value."""
+        if isinstance(arguments, dict):
+            return {key: self.resolve(value) for key, value in arguments.items()}
+        if isinstance(arguments, list):
+            resolved: List[Any] = []
+            for item in arguments:
+                value = self.resolve(item)
+                if isinstance(item, str) and item in self._handles and isinstance(value, list):
+                    resolved.extend(value)
+                else:
+                    resolved.append(value)
+            return resolved
+        if isinstance(arguments, str):
+            return self._handles.get(arguments.strip(), arguments)
+        return arguments
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "None"
+    if isinstance(value, list):
+        element_types = sorted({_type_name(item) for item in value})
+        if len(element_types) == 1:
+            return f"list[{element_types[0]}]"
+        return "list"
+    if isinstance(value, dict):
+        return "dict"
+    return type(value).__name__
+
+
+def _describe(value: Any, handle: str) -> str:
+    type_name = _type_name(value)
+    if isinstance(value, (list, dict)):
+        noun = "item" if len(value) == 1 else "items"
+        return f"{type_name} ({len(value)} {noun}, {handle})"
+    preview = json.dumps(value)
+    if len(preview) > MAX_PREVIEW_CHARS:
+        preview = preview[: MAX_PREVIEW_CHARS - 4] + '..."'
+    return f"{type_name} = {preview} ({handle})"
@@ -0,0 +1,109 @@
+from typing import Any, Dict
+
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "pq")
+
+# faiss warns when k-means gets fewer than this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def index_params(config) -> Dict[str, Any]:
+    """Reads the index type and its build and search knobs from the [faiss] section."""
+    index_type = config.get("faiss", "index_type", fallback="flat")
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown faiss index_type: {index_type}")
+    return {
+        "index_type": index_type,
+        "nlist": config.getint("faiss", "nlist", fallback=100),
+        "nprobe": config.getint("faiss", "nprobe", fallback=8),
+        "hnsw_m": config.getint("faiss", "hnsw_m", fallback=32),
+        "ef_construction": config.getint("faiss", "ef_construction", fallback=40),
+        "ef_search": config.getint("faiss", "ef_search", fallback=64),
+        "pq_m": config.getint("faiss", "pq_m", fallback=16),
+        "pq_nbits": config.getint("faiss", "pq_nbits", fallback=8),
+    }
+
+
+def _nlist(requested: int, num_vectors: int) -> int:
+    return max(1, min(requested, num_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def _pq_m(requested: int, dimensions: int) -> int:
+    # the number of sub-quantizers has to divide the vector dimensions
+    for m in range(min(requested, dimensions), 0, -1):
+        if dimensions % m == 0:
+            return m
+    return 1
+
+
+def _pq_nbits(requested: int, num_vectors: int) -> int:
+    # every sub-quantizer needs at least 2**nbits training points
+    nbits = requested
+    while nbits > 1 and 2**nbits > num_vectors:
+        nbits -= 1
+    return nbits
+
+
+def build_index(training_vectors: np.ndarray, params: Dict[str, Any]):
+    """
+    Creates an empty faiss index of the configured type, trained on
+    training_vectors when the type needs training. Vectors are added
+    separately, e.g. through FAISS.add_embeddings.
+
+    ivf is an inverted file over exact vectors, hnsw a graph index, and pq an
+    inverted file over product-quantized codes, so memory and search time
+    stay flat as the catalog grows.
+    """
+    import faiss
+
+    training_vectors = np.ascontiguousarray(training_vectors, dtype=np.float32)
+    num_vectors, dimensions = training_vectors.shape
+    index_type = params["index_type"]
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dimensions)
+    elif index_type == "ivf":
+        quantizer = faiss.IndexFlatL2(dimensions)
+        index = faiss.IndexIVFFlat(
+            quantizer, dimensions, _nlist(params["nlist"], num_vectors)
+        )
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimensions, params["hnsw_m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+    elif index_type == "pq":
+        quantizer = faiss.IndexFlatL2(dimensions)
+        index = faiss.IndexIVFPQ(
+            quantizer,
+            dimensions,
+            _nlist(params["nlist"], num_vectors),
+            _pq_m(params["pq_m"], dimensions),
+            _pq_nbits(params["pq_nbits"], num_vectors),
+        )
+    else:
+        raise ValueError(f"Unknown faiss index_type: {index_type}")
+
+    if not index.is_trained:
+        index.train(training_vectors)
+    apply_search_params(index, params)
+    return index
+
+
+def apply_search_params(index, params: Dict[str, Any]) -> None:
+    """Sets nprobe on inverted file indexes and efSearch on HNSW indexes."""
+    import faiss
+
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = params["ef_search"]
+        return
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return
+    ivf.nprobe = min(params["nprobe"], ivf.nlist)
+
+
+def index_memory_bytes(index) -> int:
+    import faiss
+
+    return int(faiss.serialize_index(index).nbytes)